@@ -0,0 +1,54 @@
+"""add retrieval log
+
+Revision ID: 8b2d6c1e9a47
+Revises: 1f9a46e4d45e
+Create Date: 2026-10-18 14:20:11.402913
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2d6c1e9a47"
+down_revision: Union[str, None] = "1f9a46e4d45e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "retrieval_log",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("query", sa.String(), nullable=False),
+        sa.Column("lang", sa.String(), nullable=False),
+        sa.Column("expanded", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column(
+            "candidates", postgresql.JSONB(astext_type=sa.Text()), nullable=False
+        ),
+        sa.Column("reranked", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("timings", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("degraded", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_retrieval_log_created_at"),
+        "retrieval_log",
+        ["created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_retrieval_log_created_at"), table_name="retrieval_log")
+    op.drop_table("retrieval_log")
@@ -0,0 +1,57 @@
+"""add reduced embedding column
+
+Revision ID: a6c2e8f41d93
+Revises: f3b9d2a6c714
+Create Date: 2026-10-18 17:04:26.581903
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6c2e8f41d93"
+down_revision: Union[str, None] = "f3b9d2a6c714"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SOURCE_TYPES = ("article", "decision")
+
+
+def upgrade() -> None:
+    # Nullable and without a default, so adding it does not rewrite the
+    # table; `embed` backfills it from chunk.embedding.
+    op.add_column(
+        "chunk",
+        sa.Column(
+            "embedding_reduced",
+            HALFVEC(dim=1024),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        for source_type in SOURCE_TYPES:
+            op.create_index(
+                f"ix_chunk_embedding_reduced_hnsw_{source_type}",
+                "chunk",
+                ["embedding_reduced"],
+                unique=False,
+                postgresql_using="hnsw",
+                postgresql_ops={"embedding_reduced": "halfvec_l2_ops"},
+                postgresql_where=sa.text(
+                    f"active IS TRUE AND source_type = '{source_type}'"
+                ),
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    for source_type in SOURCE_TYPES:
+        op.drop_index(
+            f"ix_chunk_embedding_reduced_hnsw_{source_type}", table_name="chunk"
+        )
+    op.drop_column("chunk", "embedding_reduced")
@@ -0,0 +1,84 @@
+"""store chunk embedding as halfvec
+
+Contract step of the move from vector(3584) to halfvec(3584): drops the
+sync trigger and the old column, and renames embedding_half and its
+index into place. It does no backfill itself and refuses to run while
+any row is missing its halfvec copy (see c4f1a2b7d9e3).
+
+DROP COLUMN only marks the column as dropped; the old vectors (about
+7 KB per chunk) stay on disk until the table is rewritten. Reclaim the
+space online with `pg_repack --table chunk`, or with `VACUUM FULL chunk`
+in a maintenance window (it holds an ACCESS EXCLUSIVE lock for the whole
+rewrite and needs free disk for a copy of the table).
+
+Revision ID: a9f4c2e7b1d3
+Revises: d8e3b5f0a612
+Create Date: 2026-10-18 15:04:12.316874
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a9f4c2e7b1d3"
+down_revision: Union[str, None] = "d8e3b5f0a612"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    missing = op.get_bind().scalar(
+        sa.text(
+            "SELECT count(*) FROM chunk "
+            "WHERE embedding IS NOT NULL AND embedding_half IS NULL"
+        )
+    )
+    if missing:
+        raise RuntimeError(
+            f"{missing} chunks have no embedding_half yet: run "
+            "`cli backfill-halfvec` first"
+        )
+
+    # Catalog-only changes, but ACCESS EXCLUSIVE must not queue behind
+    # long reads and stall every query waiting after it
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute("DROP TRIGGER chunk_embedding_half_sync ON chunk")
+    op.execute("DROP FUNCTION chunk_embedding_half_sync()")
+    op.drop_column("chunk", "embedding")
+    op.alter_column("chunk", "embedding_half", new_column_name="embedding")
+    op.execute(
+        "ALTER INDEX ix_chunk_embedding_half_hnsw RENAME TO ix_chunk_embedding_hnsw"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "ALTER INDEX ix_chunk_embedding_hnsw RENAME TO ix_chunk_embedding_half_hnsw"
+    )
+    op.alter_column("chunk", "embedding", new_column_name="embedding_half")
+    op.add_column("chunk", sa.Column("embedding", Vector(3584), nullable=True))
+    op.execute("UPDATE chunk SET embedding = embedding_half::vector(3584)")
+    op.execute(
+        "CREATE INDEX ix_chunk_embedding_hnsw ON chunk "
+        "USING hnsw ((embedding::halfvec(3584)) halfvec_l2_ops)"
+    )
+    op.execute(
+        """
+        CREATE FUNCTION chunk_embedding_half_sync() RETURNS trigger AS $$
+        BEGIN
+            NEW.embedding_half := NEW.embedding::halfvec(3584);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER chunk_embedding_half_sync "
+        "BEFORE INSERT OR UPDATE OF embedding ON chunk "
+        "FOR EACH ROW EXECUTE FUNCTION chunk_embedding_half_sync()"
+    )
@@ -0,0 +1,37 @@
+"""index chunks missing reduced embedding
+
+Revision ID: b3391b8219a8
+Revises: f2d8a4c6e019
+Create Date: 2026-10-18 16:26:11.199549
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3391b8219a8"
+down_revision: Union[str, None] = "f2d8a4c6e019"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_chunk_embedding_reduced_missing",
+            "chunk",
+            ["id"],
+            unique=False,
+            postgresql_where=sa.text(
+                "embedding IS NOT NULL AND embedding_reduced IS NULL"
+            ),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunk_embedding_reduced_missing", table_name="chunk")
@@ -0,0 +1,215 @@
+"""add bm25 postings and stats
+
+Revision ID: b7e4d1c9a2f5
+Revises: a6c2e8f41d93
+Create Date: 2026-10-18 18:22:09.734115
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e4d1c9a2f5"
+down_revision: Union[str, None] = "a6c2e8f41d93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chunk_term",
+        sa.Column("term", sa.String(), nullable=False),
+        sa.Column("source_type", sa.String(), nullable=False),
+        sa.Column("chunk_id", sa.Integer(), nullable=False),
+        sa.Column("tf", sa.Integer(), nullable=False),
+        sa.Column("impact", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("term", "source_type", "chunk_id"),
+    )
+    op.create_index(
+        "ix_chunk_term_impact",
+        "chunk_term",
+        ["term", "source_type", sa.literal_column("impact DESC")],
+        unique=False,
+        postgresql_include=["chunk_id"],
+    )
+    op.create_table(
+        "term_stat",
+        sa.Column("term", sa.String(), nullable=False),
+        sa.Column("source_type", sa.String(), nullable=False),
+        sa.Column("df", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("term", "source_type"),
+    )
+    op.create_table(
+        "corpus_stat",
+        sa.Column("source_type", sa.String(), nullable=False),
+        sa.Column("doc_count", sa.Integer(), nullable=False),
+        sa.Column("total_length", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("source_type"),
+    )
+
+    # BM25 term weight without idf (k1 = 1.2, b = 0.75)
+    op.execute(
+        """
+        CREATE FUNCTION bm25_impact(tf integer, len bigint, avgdl float8)
+        RETURNS float8 AS $$
+            SELECT tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len / avgdl))
+        $$ LANGUAGE sql IMMUTABLE
+        """
+    )
+    op.execute(
+        "CREATE TYPE chunk_bm25_doc AS "
+        "(id integer, source_type varchar, search_vector tsvector)"
+    )
+    # Removes and adds the postings of whole chunks and keeps term_stat and
+    # corpus_stat in step with the postings actually written.
+    op.execute(
+        """
+        CREATE FUNCTION chunk_bm25_apply(
+            removed chunk_bm25_doc[], added chunk_bm25_doc[]
+        ) RETURNS void AS $$
+        BEGIN
+            IF cardinality(removed) > 0 THEN
+                WITH docs AS (
+                    SELECT d.id, d.source_type, t.lexeme AS term
+                    FROM unnest(removed) d, unnest(d.search_vector) t
+                ), deleted AS (
+                    DELETE FROM chunk_term ct USING docs
+                    WHERE ct.term = docs.term
+                      AND ct.source_type = docs.source_type
+                      AND ct.chunk_id = docs.id
+                    RETURNING ct.term, ct.source_type, ct.chunk_id, ct.tf
+                ), df AS (
+                    UPDATE term_stat s SET df = s.df - d.n
+                    FROM (
+                        SELECT term, source_type, count(*) AS n
+                        FROM deleted GROUP BY 1, 2
+                    ) d
+                    WHERE s.term = d.term AND s.source_type = d.source_type
+                )
+                UPDATE corpus_stat c
+                SET doc_count = c.doc_count - d.n,
+                    total_length = c.total_length - d.len
+                FROM (
+                    SELECT source_type, count(DISTINCT chunk_id) AS n, sum(tf) AS len
+                    FROM deleted GROUP BY 1
+                ) d
+                WHERE c.source_type = d.source_type;
+            END IF;
+
+            IF cardinality(added) > 0 THEN
+                WITH docs AS (
+                    SELECT d.id, d.source_type, t.lexeme AS term,
+                           coalesce(array_length(t.positions, 1), 1) AS tf
+                    FROM unnest(added) d, unnest(d.search_vector) t
+                ), lengths AS (
+                    SELECT id, source_type, sum(tf) AS len
+                    FROM docs GROUP BY 1, 2
+                ), avgdl AS (
+                    SELECT l.source_type,
+                           (coalesce(max(c.total_length), 0) + sum(l.len))::float8
+                           / (coalesce(max(c.doc_count), 0) + count(*)) AS avgdl
+                    FROM lengths l LEFT JOIN corpus_stat c USING (source_type)
+                    GROUP BY l.source_type
+                ), inserted AS (
+                    INSERT INTO chunk_term (term, source_type, chunk_id, tf, impact)
+                    SELECT d.term, d.source_type, d.id, d.tf,
+                           bm25_impact(d.tf, l.len, a.avgdl)
+                    FROM docs d
+                    JOIN lengths l USING (id, source_type)
+                    JOIN avgdl a USING (source_type)
+                    ORDER BY 1, 2, 3
+                    ON CONFLICT DO NOTHING
+                    RETURNING term, source_type, chunk_id, tf
+                ), df AS (
+                    INSERT INTO term_stat AS s (term, source_type, df)
+                    SELECT term, source_type, count(*)
+                    FROM inserted GROUP BY 1, 2 ORDER BY 1, 2
+                    ON CONFLICT (term, source_type)
+                    DO UPDATE SET df = s.df + excluded.df
+                )
+                INSERT INTO corpus_stat AS c (source_type, doc_count, total_length)
+                SELECT source_type, count(DISTINCT chunk_id), sum(tf)
+                FROM inserted GROUP BY 1
+                ON CONFLICT (source_type) DO UPDATE
+                SET doc_count = c.doc_count + excluded.doc_count,
+                    total_length = c.total_length + excluded.total_length;
+            END IF;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # Statement-level, so bulk inserts update the stats once per statement;
+    # updates only touch chunks whose active flag, source type or text changed.
+    op.execute(
+        """
+        CREATE FUNCTION chunk_bm25_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM chunk_bm25_apply('{}', ARRAY(
+                    SELECT ROW(id, source_type, search_vector)::chunk_bm25_doc
+                    FROM new_rows WHERE active
+                ));
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM chunk_bm25_apply(ARRAY(
+                    SELECT ROW(id, source_type, search_vector)::chunk_bm25_doc
+                    FROM old_rows WHERE active
+                ), '{}');
+            ELSE
+                PERFORM chunk_bm25_apply(
+                    ARRAY(
+                        SELECT ROW(o.id, o.source_type, o.search_vector)::chunk_bm25_doc
+                        FROM old_rows o JOIN new_rows n USING (id)
+                        WHERE o.active AND (
+                            n.active IS DISTINCT FROM o.active
+                            OR n.source_type IS DISTINCT FROM o.source_type
+                            OR n.search_vector IS DISTINCT FROM o.search_vector
+                        )
+                    ),
+                    ARRAY(
+                        SELECT ROW(n.id, n.source_type, n.search_vector)::chunk_bm25_doc
+                        FROM old_rows o JOIN new_rows n USING (id)
+                        WHERE n.active AND (
+                            n.active IS DISTINCT FROM o.active
+                            OR n.source_type IS DISTINCT FROM o.source_type
+                            OR n.search_vector IS DISTINCT FROM o.search_vector
+                        )
+                    )
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER chunk_bm25_insert AFTER INSERT ON chunk "
+        "REFERENCING NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION chunk_bm25_sync()"
+    )
+    op.execute(
+        "CREATE TRIGGER chunk_bm25_update AFTER UPDATE ON chunk "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION chunk_bm25_sync()"
+    )
+    op.execute(
+        "CREATE TRIGGER chunk_bm25_delete AFTER DELETE ON chunk "
+        "REFERENCING OLD TABLE AS old_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION chunk_bm25_sync()"
+    )
+
+
+def downgrade() -> None:
+    for trigger in ("chunk_bm25_insert", "chunk_bm25_update", "chunk_bm25_delete"):
+        op.execute(f"DROP TRIGGER {trigger} ON chunk")
+    op.execute("DROP FUNCTION chunk_bm25_sync()")
+    op.execute("DROP FUNCTION chunk_bm25_apply(chunk_bm25_doc[], chunk_bm25_doc[])")
+    op.execute("DROP TYPE chunk_bm25_doc")
+    op.execute("DROP FUNCTION bm25_impact(integer, bigint, float8)")
+    op.drop_table("corpus_stat")
+    op.drop_table("term_stat")
+    op.drop_index("ix_chunk_term_impact", table_name="chunk_term")
+    op.drop_table("chunk_term")
@@ -0,0 +1,100 @@
+"""add chunk.lang and language-stemmed search vector
+
+Revision ID: c4a8f2e6d913
+Revises: b7e4d1c9a2f5
+Create Date: 2026-10-18 21:04:51.208317
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a8f2e6d913"
+down_revision: Union[str, None] = "b7e4d1c9a2f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # Both nullable and without a default, so adding them does not rewrite
+    # the table.
+    op.add_column("chunk", sa.Column("lang", sa.String(), nullable=True))
+    op.add_column(
+        "chunk",
+        sa.Column("search_vector_lang", postgresql.TSVECTOR(), nullable=True),
+    )
+
+    # Same mapping as app.db.models.chunks.TS_CONFIGS
+    op.execute(
+        """
+        CREATE FUNCTION chunk_ts_config(lang varchar) RETURNS regconfig AS $$
+            SELECT CASE lang
+                WHEN 'de' THEN 'german'
+                WHEN 'fr' THEN 'french'
+                WHEN 'it' THEN 'italian'
+                ELSE 'simple'
+            END::regconfig
+        $$ LANGUAGE sql IMMUTABLE
+        """
+    )
+    # A trigger rather than a generated column: the configuration depends on
+    # another column, and a trigger lets the backfill run in batches.
+    op.execute(
+        """
+        CREATE FUNCTION chunk_search_vector_lang_sync() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector_lang := to_tsvector(chunk_ts_config(NEW.lang), NEW.text);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER chunk_search_vector_lang_sync "
+        "BEFORE INSERT OR UPDATE OF text, lang ON chunk "
+        "FOR EACH ROW EXECUTE FUNCTION chunk_search_vector_lang_sync()"
+    )
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        max_id = conn.scalar(sa.text("SELECT max(id) FROM chunk")) or 0
+        for start in range(0, max_id, BATCH_SIZE):
+            conn.execute(
+                sa.text(
+                    """
+                    UPDATE chunk c SET lang = coalesce(
+                        (SELECT act.lang FROM article
+                         JOIN act ON act.id = article.act_id
+                         WHERE article.id = c.article_id),
+                        (SELECT decision.lang FROM decision
+                         WHERE decision.id = c.decision_id)
+                    )
+                    WHERE c.id > :start AND c.id <= :end
+                    """
+                ),
+                {"start": start, "end": start + BATCH_SIZE},
+            )
+        op.create_index(
+            "ix_chunk_search_vector_lang",
+            "chunk",
+            ["search_vector_lang"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunk_search_vector_lang", table_name="chunk")
+    op.execute("DROP TRIGGER chunk_search_vector_lang_sync ON chunk")
+    op.execute("DROP FUNCTION chunk_search_vector_lang_sync()")
+    op.execute("DROP FUNCTION chunk_ts_config(varchar)")
+    op.drop_column("chunk", "search_vector_lang")
+    op.drop_column("chunk", "lang")
@@ -0,0 +1,50 @@
+"""add chunk embedding_half
+
+Expand step of the move from vector(3584) to halfvec(3584): adds the new
+column and a trigger that keeps it in sync with writes to `embedding`.
+Fill existing rows online with `cli backfill-halfvec` before upgrading
+further: the next revisions refuse to run while any row is missing.
+
+Revision ID: c4f1a2b7d9e3
+Revises: 8b2d6c1e9a47
+Create Date: 2026-10-18 14:52:06.118204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4f1a2b7d9e3"
+down_revision: Union[str, None] = "8b2d6c1e9a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("chunk", sa.Column("embedding_half", HALFVEC(3584), nullable=True))
+    op.execute(
+        """
+        CREATE FUNCTION chunk_embedding_half_sync() RETURNS trigger AS $$
+        BEGIN
+            NEW.embedding_half := NEW.embedding::halfvec(3584);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER chunk_embedding_half_sync "
+        "BEFORE INSERT OR UPDATE OF embedding ON chunk "
+        "FOR EACH ROW EXECUTE FUNCTION chunk_embedding_half_sync()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER chunk_embedding_half_sync ON chunk")
+    op.execute("DROP FUNCTION chunk_embedding_half_sync()")
+    op.drop_column("chunk", "embedding_half")
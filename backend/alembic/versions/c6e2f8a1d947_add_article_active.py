@@ -0,0 +1,40 @@
+"""add article.active
+
+Revision ID: c6e2f8a1d947
+Revises: b3391b8219a8
+Create Date: 2026-10-18 18:07:52.518203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c6e2f8a1d947"
+down_revision: Union[str, None] = "b3391b8219a8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "article",
+        sa.Column("active", sa.Boolean(), server_default="true", nullable=False),
+    )
+    # Articles load-fedlex removed so far are those left with inactive chunks only
+    op.execute(
+        """
+        UPDATE article a SET active = false
+        WHERE EXISTS (SELECT 1 FROM chunk c WHERE c.article_id = a.id)
+          AND NOT EXISTS (
+              SELECT 1 FROM chunk c WHERE c.article_id = a.id AND c.active
+          )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("article", "active")
@@ -0,0 +1,73 @@
+"""add chunk.citation and chunk.source_url
+
+Backfills both from the chunk's article or decision, in id ranges that
+commit on their own, so search never reads a chunk without a citation.
+The formatting mirrors article_citation, article_source_url and
+decision_citation; `backfill-chunk-sources` recomputes them from
+Python after those change.
+
+Revision ID: d5b9e3f7a124
+Revises: c4a8f2e6d913
+Create Date: 2026-10-18 23:12:40.517962
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5b9e3f7a124"
+down_revision: Union[str, None] = "c4a8f2e6d913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+ARTICLE_SOURCES = """
+    UPDATE chunk SET
+        citation = CASE
+            WHEN coalesce(article.number, '') <> '' AND coalesce(act.abbr, '') <> ''
+            THEN concat(article.number, ' ', act.abbr)
+            ELSE concat(
+                article.number, ' ', act.title, ' ',
+                to_char(act.applicability_date, 'YYYY-MM-DD'),
+                CASE WHEN act.lang = 'de' THEN ' (SR ' ELSE ' (RS ' END,
+                act.sr_number, ')'
+            )
+        END,
+        source_url = concat(act.source_url, '#', article.eid)
+    FROM article JOIN act ON act.id = article.act_id
+    WHERE article.id = chunk.article_id
+      AND chunk.id >= :lo AND chunk.id < :hi AND chunk.citation IS NULL
+"""
+
+DECISION_SOURCES = """
+    UPDATE chunk SET
+        citation = concat(decision.number, ' (', extract(year FROM decision.date)::int, ')'),
+        source_url = decision.source_url
+    FROM decision
+    WHERE decision.id = chunk.decision_id
+      AND chunk.id >= :lo AND chunk.id < :hi AND chunk.citation IS NULL
+"""
+
+
+def upgrade() -> None:
+    op.add_column("chunk", sa.Column("citation", sa.String(), nullable=True))
+    op.add_column("chunk", sa.Column("source_url", sa.String(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.scalar(sa.text("SELECT max(id) FROM chunk")) or 0
+        for lo in range(0, max_id + 1, BATCH_SIZE):
+            for statement in (ARTICLE_SOURCES, DECISION_SOURCES):
+                bind.execute(sa.text(statement), {"lo": lo, "hi": lo + BATCH_SIZE})
+
+    op.alter_column("chunk", "citation", nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("chunk", "source_url")
+    op.drop_column("chunk", "citation")
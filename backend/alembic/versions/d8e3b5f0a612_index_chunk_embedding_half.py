@@ -0,0 +1,57 @@
+"""index chunk embedding_half
+
+Builds the HNSW index on the halfvec column while the expression index
+on the old column keeps serving searches, so the contract revision
+(a9f4c2e7b1d3) never leaves the table without a vector index.
+
+Refuses to run until `cli backfill-halfvec` has filled every row. On a
+database that is still before c4f1a2b7d9e3, upgrade to that revision,
+run the backfill, then upgrade to head.
+
+Revision ID: d8e3b5f0a612
+Revises: c4f1a2b7d9e3
+Create Date: 2026-10-18 14:58:40.530671
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d8e3b5f0a612"
+down_revision: Union[str, None] = "c4f1a2b7d9e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    missing = op.get_bind().scalar(
+        sa.text(
+            "SELECT count(*) FROM chunk "
+            "WHERE embedding IS NOT NULL AND embedding_half IS NULL"
+        )
+    )
+    if missing:
+        raise RuntimeError(
+            f"{missing} chunks have no embedding_half yet: run "
+            "`alembic upgrade c4f1a2b7d9e3` and `cli backfill-halfvec` first"
+        )
+
+    # Build outside the migration transaction so writes are not blocked
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_chunk_embedding_half_hnsw",
+            "chunk",
+            ["embedding_half"],
+            unique=False,
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding_half": "halfvec_l2_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunk_embedding_half_hnsw", table_name="chunk")
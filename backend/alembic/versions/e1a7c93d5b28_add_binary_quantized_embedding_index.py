@@ -0,0 +1,29 @@
+"""add binary quantized embedding index
+
+Revision ID: e1a7c93d5b28
+Revises: a9f4c2e7b1d3
+Create Date: 2026-10-18 15:31:12.804527
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e1a7c93d5b28"
+down_revision: Union[str, None] = "a9f4c2e7b1d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_chunk_embedding_bq ON chunk "
+            "USING hnsw ((binary_quantize(embedding)::bit(3584)) bit_hamming_ops)"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunk_embedding_bq", table_name="chunk")
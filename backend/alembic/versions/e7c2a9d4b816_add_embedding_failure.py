@@ -0,0 +1,40 @@
+"""add embedding_failure
+
+Revision ID: e7c2a9d4b816
+Revises: d5b9e3f7a124
+Create Date: 2026-10-19 09:41:27.306118
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e7c2a9d4b816"
+down_revision: Union[str, None] = "d5b9e3f7a124"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_failure",
+        sa.Column("chunk_id", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="1", nullable=False),
+        sa.Column(
+            "failed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["chunk_id"], ["chunk.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("chunk_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_failure")
@@ -0,0 +1,35 @@
+"""add embedding_store
+
+Revision ID: f2d8a4c6e019
+Revises: e7c2a9d4b816
+Create Date: 2026-10-19 13:05:52.871904
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2d8a4c6e019"
+down_revision: Union[str, None] = "e7c2a9d4b816"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled as chunks are embedded; run `backfill-embedding-store` to
+    # add the embeddings chunks already have.
+    op.create_table(
+        "embedding_store",
+        sa.Column("key", sa.LargeBinary(), nullable=False),
+        sa.Column("embedding", HALFVEC(3584), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_store")
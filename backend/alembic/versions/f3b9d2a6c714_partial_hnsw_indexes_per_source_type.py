@@ -0,0 +1,62 @@
+"""partial hnsw indexes per source type
+
+Revision ID: f3b9d2a6c714
+Revises: e1a7c93d5b28
+Create Date: 2026-10-18 16:12:47.219650
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b9d2a6c714"
+down_revision: Union[str, None] = "e1a7c93d5b28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SOURCE_TYPES = ("article", "decision")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for source_type in SOURCE_TYPES:
+            op.create_index(
+                f"ix_chunk_embedding_hnsw_{source_type}",
+                "chunk",
+                ["embedding"],
+                unique=False,
+                postgresql_using="hnsw",
+                postgresql_ops={"embedding": "halfvec_l2_ops"},
+                postgresql_where=sa.text(
+                    f"active IS TRUE AND source_type = '{source_type}'"
+                ),
+                postgresql_concurrently=True,
+            )
+        op.drop_index(
+            "ix_chunk_embedding_hnsw",
+            table_name="chunk",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_chunk_embedding_hnsw",
+            "chunk",
+            ["embedding"],
+            unique=False,
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "halfvec_l2_ops"},
+            postgresql_concurrently=True,
+        )
+        for source_type in SOURCE_TYPES:
+            op.drop_index(
+                f"ix_chunk_embedding_hnsw_{source_type}",
+                table_name="chunk",
+                postgresql_concurrently=True,
+            )
@@ -1,25 +1,35 @@
-from fastapi import APIRouter, Cookie, Depends
+from fastapi import APIRouter, Cookie
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
 
-from app.core.clients import cohere_client, openai_client
-from app.core.deps import get_session, session_context
+from app.core.cache import embedding_cache, expansion_cache, rerank_cache
+from app.core.clients import (
+    async_cohere_client,
+    async_openai_client,
+    cohere_client,
+    openai_client,
+)
+from app.core.config import settings
 from app.core.types import Language
-from app.repositories.chunk_repository import ChunkRepository
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.repositories.chunk_repository import AsyncChunkRepository, ChunkRepository
 from app.schemas.chat import ChatRequest
 from app.schemas.events import Event
-from app.services.chat_service import ChatService
-from app.services.embedding_service import EmbeddingService
-from app.services.llm_service import LLMService
-from app.services.query_expansion_service import QueryExpansionService
-from app.services.reranker_service import RerankerService
+from app.services.chat_service import AsyncChatService, ChatService
+from app.services.embedding_service import AsyncEmbeddingService, EmbeddingService
+from app.services.llm_service import AsyncLLMService, LLMService
+from app.services.query_expansion_service import (
+    AsyncQueryExpansionService,
+    QueryExpansionService,
+)
+from app.services.reranker_service import AsyncRerankerService, RerankerService
+from app.services.retrieval_log_service import retrieval_log
 
 router = APIRouter(tags=["chat"])
 
 
-def get_chat_service(db: Session = Depends(get_session)) -> ChatService:
+def get_chat_service() -> ChatService:
     return ChatService(
-        chunk_repo=ChunkRepository(db),
+        chunk_repo=ChunkRepository(SessionLocal),
         embedding_service=EmbeddingService(openai_client),
         llm_service=LLMService(openai_client),
         query_expansion_service=QueryExpansionService(openai_client),
@@ -27,6 +37,21 @@ def get_chat_service(db: Session = Depends(get_session)) -> ChatService:
     )
 
 
+def get_async_chat_service() -> AsyncChatService:
+    return AsyncChatService(
+        chunk_repo=AsyncChunkRepository(AsyncSessionLocal),
+        embedding_service=AsyncEmbeddingService(
+            async_openai_client, cache=embedding_cache
+        ),
+        llm_service=AsyncLLMService(async_openai_client),
+        query_expansion_service=AsyncQueryExpansionService(
+            async_openai_client, cache=expansion_cache
+        ),
+        reranker=AsyncRerankerService(async_cohere_client, cache=rerank_cache),
+        retrieval_log=retrieval_log if settings.retrieval_log_enabled else None,
+    )
+
+
 def format_sse(event: Event) -> str:
     return f"data: {event.model_dump_json()}\n\n"
 
@@ -36,14 +61,29 @@ async def create_message(
     request: ChatRequest,
     lang: Language = Cookie(default="de"),
 ):
-    def event_stream():
-        with session_context() as db:
-            svc = get_chat_service(db)
-            for event in svc.process_message(
-                messages=request.messages,
-                model=request.model,
-                lang=lang,
-            ):
-                yield format_sse(event)
-
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    if settings.chat_pipeline == "sync":
+        stream = _sync_event_stream(request, lang)
+    else:
+        stream = _async_event_stream(request, lang)
+
+    return StreamingResponse(stream, media_type="text/event-stream")
+
+
+def _sync_event_stream(request: ChatRequest, lang: Language):
+    svc = get_chat_service()
+    for event in svc.process_message(
+        messages=request.messages,
+        model=request.model,
+        lang=lang,
+    ):
+        yield format_sse(event)
+
+
+async def _async_event_stream(request: ChatRequest, lang: Language):
+    svc = get_async_chat_service()
+    async for event in svc.process_message(
+        messages=request.messages,
+        model=request.model,
+        lang=lang,
+    ):
+        yield format_sse(event)
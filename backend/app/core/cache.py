@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import redis.asyncio
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_key_text(text: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def hash_key(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.local_hits + self.redis_hits + self.misses
+        return (self.local_hits + self.redis_hits) / total if total else 0.0
+
+
+# Weak, so caches built per test or per service instance can go away
+_registry: "weakref.WeakSet[TieredCache]" = weakref.WeakSet()
+
+
+def cache_stats() -> dict[str, CacheStats]:
+    """Stats of the live caches, summed per namespace."""
+    totals: dict[str, CacheStats] = {}
+    for cache in list(_registry):
+        total = totals.setdefault(cache.namespace, CacheStats())
+        total.local_hits += cache.stats.local_hits
+        total.redis_hits += cache.stats.redis_hits
+        total.misses += cache.stats.misses
+    return totals
+
+
+class TieredCache:
+    """Bounded in-process LRU in front of a shared Redis tier.
+
+    Values are opaque bytes; callers own the encoding. Redis failures are
+    logged and treated as misses. Instances register so their stats can be
+    exported per namespace.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        maxsize: int,
+        ttl: int,
+        redis: Callable[[], redis.asyncio.Redis] = get_async_redis,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRUCache(maxsize)
+        self.stats = CacheStats()
+        self._redis = redis
+        _registry.add(self)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> bytes | None:
+        value = self.local.get(key)
+        if value is not None:
+            self.stats.local_hits += 1
+            return value
+
+        try:
+            value = await self._redis().get(self._redis_key(key))
+        except RedisError:
+            logger.warning("Cache read failed [%s]", self.namespace, exc_info=True)
+            value = None
+
+        if value is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.redis_hits += 1
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        self.local.set(key, value)
+        try:
+            await self._redis().set(self._redis_key(key), value, ex=self.ttl)
+        except RedisError:
+            logger.warning("Cache write failed [%s]", self.namespace, exc_info=True)
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        """Like get(), but resolves all local misses with a single MGET."""
+        values = [self.local.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        self.stats.local_hits += len(keys) - len(missing)
+        if not missing:
+            return values
+
+        try:
+            fetched = await self._redis().mget(
+                [self._redis_key(keys[i]) for i in missing]
+            )
+        except RedisError:
+            logger.warning("Cache read failed [%s]", self.namespace, exc_info=True)
+            fetched = [None] * len(missing)
+
+        for i, value in zip(missing, fetched):
+            if value is None:
+                self.stats.misses += 1
+                continue
+            self.stats.redis_hits += 1
+            self.local.set(keys[i], value)
+            values[i] = value
+        return values
+
+    async def set_many(self, items: dict[str, bytes]) -> None:
+        if not items:
+            return
+        for key, value in items.items():
+            self.local.set(key, value)
+        try:
+            pipe = self._redis().pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(self._redis_key(key), value, ex=self.ttl)
+            await pipe.execute()
+        except RedisError:
+            logger.warning("Cache write failed [%s]", self.namespace, exc_info=True)
+
+
+embedding_cache = TieredCache(
+    "emb",
+    maxsize=settings.embedding_cache_size,
+    ttl=settings.embedding_cache_ttl,
+)
+
+expansion_cache = TieredCache(
+    "qexp",
+    maxsize=settings.expansion_cache_size,
+    ttl=settings.expansion_cache_ttl,
+)
+
+rerank_cache = TieredCache(
+    "rrk",
+    maxsize=settings.rerank_cache_size,
+    ttl=settings.rerank_cache_ttl,
+)
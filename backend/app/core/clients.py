@@ -1,6 +1,6 @@
 import cohere
 from anthropic import Anthropic
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from app.core.config import settings
 
@@ -9,9 +9,16 @@ openai_client = OpenAI(
     base_url=settings.openai_base_url,
 )
 
+async_openai_client = AsyncOpenAI(
+    api_key=settings.openai_api_key,
+    base_url=settings.openai_base_url,
+)
+
 bulk_embedding_client = OpenAI(
     api_key=settings.bulk_embedding_api_key,
     base_url=settings.bulk_embedding_base_url,
+    # embed_missing_chunks retries through a limiter shared by its workers
+    max_retries=0,
 )
 
 anthropic_client = Anthropic(
@@ -22,3 +29,8 @@ cohere_client = cohere.ClientV2(
     api_key=settings.cohere_api_key,
     base_url=settings.cohere_base_url,
 )
+
+async_cohere_client = cohere.AsyncClientV2(
+    api_key=settings.cohere_api_key,
+    base_url=settings.cohere_base_url,
+)
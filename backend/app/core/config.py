@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,10 +11,33 @@ class Settings(BaseSettings):
     secret_key: str
     contact_email: str | None = None
     sentry_dsn: str | None = None
+    # Bearer token Prometheus sends to scrape /metrics; unset disables it
+    metrics_token: str | None = None
+
+    # Chat pipeline ("sync" keeps the threadpool-based path for A/B comparison)
+    chat_pipeline: Literal["async", "sync"] = "async"
 
     # Database & Redis
     database_url: str
     redis_url: str = "redis://localhost:6379/0"
+    # Connection pool of each engine (sync and async); the timeout is how
+    # long a checkout waits for a free connection before failing
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = True
+    # Seconds a search statement may run (0 disables); set per search
+    # transaction, so CLI batch jobs are not affected
+    db_statement_timeout: float = 0.0
+
+    # Caches (in-process LRU entries / Redis TTL in seconds)
+    cache_redis_timeout: float = 0.25
+    embedding_cache_size: int = 1024
+    embedding_cache_ttl: int = 7 * 24 * 3600
+    expansion_cache_size: int = 1024
+    expansion_cache_ttl: int = 24 * 3600
+    rerank_cache_size: int = 16384
+    rerank_cache_ttl: int = 24 * 3600
 
     # OpenAI-compatible chat API
     openai_api_key: str
@@ -26,7 +51,13 @@ class Settings(BaseSettings):
     bulk_embedding_base_url: str
     bulk_embedding_model: str
     bulk_embedding_batch_size: int
+    # Ceiling for the adaptive concurrency, and an optional rate cap
     bulk_embedding_max_workers: int
+    bulk_embedding_requests_per_minute: int | None = None
+    # Token budget per request, estimated at chars_per_token unless a
+    # tokenizer is passed to embed_missing_chunks
+    bulk_embedding_max_tokens: int = 16384
+    bulk_embedding_chars_per_token: float = 3.0
 
     # Anthropic
     anthropic_api_key: str
@@ -53,6 +84,51 @@ class Settings(BaseSettings):
     search_decision_top_k: int = 8
     rerank_article_candidates: int = 24
     rerank_decision_candidates: int = 16
+    # "parallel": one search per source type on separate connections,
+    # "combined": one multi-source statement (search_chunks_multi)
+    search_strategy: Literal["parallel", "combined"] = "parallel"
+    # "hnsw": walk the halfvec HNSW index; "binary" / "reduced": take
+    # rescore_factor x more candidates from the binary_quantize index or the
+    # truncated embedding_reduced index and re-score them with the exact
+    # halfvec distance
+    vector_search: Literal["hnsw", "binary", "reduced"] = "hnsw"
+    rescore_factor: int = 4
+    # HNSW scan depth (raised per query to cover its candidate count) and
+    # pgvector's iterative scan, which keeps scanning when filters drop rows
+    hnsw_ef_search: int = 100
+    hnsw_iterative_scan: Literal["off", "relaxed_order", "strict_order"] = (
+        "relaxed_order"
+    )
+    # "ts_rank": rank tsquery matches (all terms) with ts_rank; "bm25": rank
+    # by BM25 over the chunk_term postings, reading at most
+    # bm25_term_candidates postings per query term
+    fts_ranking: Literal["ts_rank", "bm25"] = "ts_rank"
+    bm25_term_candidates: int = 200
+    # ts_rank search over "simple" (unstemmed) or "language" vectors, stemmed
+    # with each chunk's de/fr/it configuration. BM25 postings stay on the
+    # simple vector.
+    fts_config: Literal["simple", "language"] = "simple"
+    # "rrf": each expanded query is ranked on its own and fused by RRF;
+    # "merged": a source type's expanded queries are ORed into one query and
+    # ranked once, so full text adds a single list to RRF
+    fts_fusion: Literal["rrf", "merged"] = "rrf"
+
+    # Latency budget: per-stage deadlines in seconds (0 disables). Expired
+    # stages fall back and are listed in the stream's metadata event.
+    expansion_timeout: float = 2.0
+    embedding_timeout: float = 1.5
+    search_timeout: float = 3.0
+    rerank_timeout: float = 2.0
+    # Send a second identical request when the first is still pending after
+    # this many seconds, e.g. the stage's p95 (0 disables hedging)
+    expansion_hedge_after: float = 0
+    rerank_hedge_after: float = 0
+
+    # Retrieval log: candidates, ranks and timings per chat request, written
+    # in bulk by a background task
+    retrieval_log_enabled: bool = False
+    retrieval_log_flush_interval: float = 5.0
+    retrieval_log_max_pending: int = 10000
 
 
 settings = Settings()  # type: ignore
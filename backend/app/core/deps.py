@@ -1,10 +1,13 @@
+import secrets
 from contextlib import contextmanager
 from typing import Annotated
 
 import redis
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.redis import get_redis
 from app.db.session import SessionLocal
 
@@ -34,3 +37,16 @@ def get_redis_connection():
 
 
 RedisDep = Annotated[redis.Redis, Depends(get_redis_connection)]
+
+
+def verify_metrics_token(
+    credentials: Annotated[
+        HTTPAuthorizationCredentials | None, Depends(HTTPBearer(auto_error=False))
+    ],
+):
+    if not settings.metrics_token:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials, settings.metrics_token
+    ):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,128 @@
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.registry import REGISTRY, Collector
+
+from app.core.cache import cache_stats
+
+try:
+    from opentelemetry import trace
+except ImportError:  # tracing is optional
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+_tracer = trace.get_tracer("almalex") if trace else None
+
+# Latency buckets from 10ms up to the length of a long answer stream.
+_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "almalex_stage_seconds",
+    "Duration of a chat pipeline stage",
+    ["stage"],
+    buckets=_BUCKETS,
+)
+STAGE_DEGRADED = Counter(
+    "almalex_stage_degraded_total",
+    "Stages that failed or exceeded their latency budget and fell back",
+    ["stage"],
+)
+FIRST_TOKEN_SECONDS = Histogram(
+    "almalex_time_to_first_token_seconds",
+    "Time from request to the first thinking or text token",
+    ["pipeline", "kind"],
+    buckets=_BUCKETS,
+)
+STREAM_SECONDS = Histogram(
+    "almalex_stream_seconds",
+    "Total duration of a chat response stream",
+    ["pipeline"],
+    buckets=_BUCKETS,
+)
+DB_CHECKOUT_SECONDS = Histogram(
+    "almalex_db_checkout_seconds",
+    "Time a search waited for a pooled database connection",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+RETRIEVAL_LOG_DROPPED = Counter(
+    "almalex_retrieval_log_dropped_total",
+    "Retrieval traces lost because the buffer was full or the write failed",
+    ["reason"],
+)
+TOKENS_PER_SECOND = Histogram(
+    "almalex_tokens_per_second",
+    "Generation rate in streamed deltas per second after the first token",
+    ["pipeline"],
+    buckets=(1, 5, 10, 20, 40, 60, 80, 120, 200, 400),
+)
+
+
+@contextmanager
+def stage(name: str, timings: dict[str, float] | None = None):
+    """Time a pipeline stage into STAGE_SECONDS and an optional span.
+
+    The duration is also stored under `name` in `timings` if given.
+    """
+    t0 = time.perf_counter()
+    with _tracer.start_as_current_span(name) if _tracer else nullcontext():
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            STAGE_SECONDS.labels(name).observe(elapsed)
+            if timings is not None:
+                timings[name] = elapsed
+            logger.info("%s took %.2fs", name, elapsed)
+
+
+class StreamMetrics:
+    """Per-request timings for a chat response stream."""
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.t0 = time.perf_counter()
+        self.first_token: dict[str, float] = {}
+        self.deltas = 0
+
+    def observe(self, event_type: str) -> None:
+        kind = {"thinking_delta": "thinking", "text_delta": "text"}.get(event_type)
+        if kind is None:
+            return
+        self.deltas += 1
+        if kind not in self.first_token:
+            self.first_token[kind] = time.perf_counter()
+            FIRST_TOKEN_SECONDS.labels(self.pipeline, kind).observe(
+                self.first_token[kind] - self.t0
+            )
+
+    def finish(self) -> None:
+        now = time.perf_counter()
+        STREAM_SECONDS.labels(self.pipeline).observe(now - self.t0)
+        if self.first_token and self.deltas > 1:
+            elapsed = now - min(self.first_token.values())
+            if elapsed > 0:
+                TOKENS_PER_SECOND.labels(self.pipeline).observe(
+                    (self.deltas - 1) / elapsed
+                )
+
+
+class _CacheCollector(Collector):
+    def collect(self):
+        requests = CounterMetricFamily(
+            "almalex_cache_requests",
+            "Tiered cache lookups by result",
+            labels=["cache", "result"],
+        )
+        for namespace, stats in cache_stats().items():
+            requests.add_metric([namespace, "local_hit"], stats.local_hits)
+            requests.add_metric([namespace, "redis_hit"], stats.redis_hits)
+            requests.add_metric([namespace, "miss"], stats.misses)
+        yield requests
+
+
+REGISTRY.register(_CacheCollector())
@@ -1,4 +1,5 @@
 import redis
+import redis.asyncio
 
 from app.core.config import settings
 
@@ -6,6 +7,7 @@ from app.core.config import settings
 class RedisConnection:
     def __init__(self):
         self._redis = None
+        self._async_redis = None
 
     def get_connection(self) -> redis.Redis:
         if self._redis is None:
@@ -17,6 +19,17 @@ class RedisConnection:
             )
         return self._redis
 
+    def get_async_connection(self) -> redis.asyncio.Redis:
+        """Binary-safe async connection used by the caches; short timeouts
+        so a slow Redis degrades to a cache miss instead of a slow chat."""
+        if self._async_redis is None:
+            self._async_redis = redis.asyncio.from_url(
+                settings.redis_url,
+                socket_connect_timeout=settings.cache_redis_timeout,
+                socket_timeout=settings.cache_redis_timeout,
+            )
+        return self._async_redis
+
     def close(self):
         if self._redis:
             self._redis.close()
@@ -28,3 +41,7 @@ redis_connection = RedisConnection()
 
 def get_redis() -> redis.Redis:
     return redis_connection.get_connection()
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    return redis_connection.get_async_connection()
@@ -1,7 +1,11 @@
 from app.db.base import Base
+from app.db.models.bm25 import ChunkTerm, CorpusStat, TermStat
 from app.db.models.chunks import Chunk
 from app.db.models.decisions import Decision, DecisionFile
+from app.db.models.embedding_failure import EmbeddingFailure
+from app.db.models.embedding_store import EmbeddingStore
 from app.db.models.legal import Act, ActConfig, Article
+from app.db.models.retrieval_log import RetrievalLog
 
 __all__ = [
     "Base",
@@ -9,6 +13,12 @@ __all__ = [
     "ActConfig",
     "Article",
     "Chunk",
+    "ChunkTerm",
+    "CorpusStat",
     "Decision",
     "DecisionFile",
+    "EmbeddingFailure",
+    "EmbeddingStore",
+    "RetrievalLog",
+    "TermStat",
 ]
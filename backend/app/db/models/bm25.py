@@ -0,0 +1,51 @@
+from sqlalchemy import BigInteger, Index, desc
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ChunkTerm(Base):
+    """BM25 posting: one row per (term, active chunk).
+
+    Maintained by the chunk_bm25_sync trigger from chunk.search_vector;
+    `impact` is the term's BM25 weight in the chunk without idf.
+    """
+
+    __tablename__ = "chunk_term"
+
+    term: Mapped[str] = mapped_column(primary_key=True)
+    source_type: Mapped[str] = mapped_column(primary_key=True)
+    chunk_id: Mapped[int] = mapped_column(primary_key=True)
+    tf: Mapped[int]
+    impact: Mapped[float]
+
+    __table_args__ = (
+        # Postings in impact order, so each query term reads only its best
+        Index(
+            "ix_chunk_term_impact",
+            "term",
+            "source_type",
+            desc("impact"),
+            postgresql_include=["chunk_id"],
+        ),
+    )
+
+
+class TermStat(Base):
+    """Document frequency of a term per source type."""
+
+    __tablename__ = "term_stat"
+
+    term: Mapped[str] = mapped_column(primary_key=True)
+    source_type: Mapped[str] = mapped_column(primary_key=True)
+    df: Mapped[int]
+
+
+class CorpusStat(Base):
+    """Active chunk count and total length (in terms) per source type."""
+
+    __tablename__ = "corpus_stat"
+
+    source_type: Mapped[str] = mapped_column(primary_key=True)
+    doc_count: Mapped[int]
+    total_length: Mapped[int] = mapped_column(BigInteger)
@@ -1,10 +1,19 @@
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import Computed, ForeignKey, Index
+import math
+
+from pgvector.sqlalchemy import BIT, HALFVEC
+from sqlalchemy import Computed, ForeignKey, Index, cast, func, text
 from sqlalchemy.dialects.postgresql import TSVECTOR
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, deferred, mapped_column, relationship
 
 from app.db.base import Base
 
+EMBEDDING_DIMS = 3584
+# Leading dimensions kept in embedding_reduced (see reduce_embedding)
+REDUCED_EMBEDDING_DIMS = 1024
+# Text search configuration per chunk language for search_vector_lang
+# (kept in sync with chunk_ts_config() in the database); others use simple
+TS_CONFIGS = {"de": "german", "fr": "french", "it": "italian"}
+
 
 class Chunk(Base):
     __tablename__ = "chunk"
@@ -20,16 +29,85 @@ class Chunk(Base):
     active: Mapped[bool] = mapped_column(
         default=True, server_default="true", index=True
     )
+    # Language of the act or decision
+    lang: Mapped[str | None]
+    # Stored at ingest (see backfill-chunk-sources) so search needs no joins
+    citation: Mapped[str]
+    source_url: Mapped[str | None]
     text: Mapped[str]
     context: Mapped[str | None]
     embedding_input: Mapped[str | None]
-    embedding: Mapped[Vector | None] = mapped_column(Vector(3584))
+    embedding: Mapped[HALFVEC | None] = mapped_column(HALFVEC(EMBEDDING_DIMS))
+    embedding_reduced: Mapped[HALFVEC | None] = mapped_column(
+        HALFVEC(REDUCED_EMBEDDING_DIMS)
+    )
     search_vector = mapped_column(
         TSVECTOR,
         Computed("to_tsvector('simple', text)", persisted=True),
     )
+    # Stemmed with the configuration of `lang`, maintained by the
+    # chunk_search_vector_lang_sync trigger
+    search_vector_lang = deferred(mapped_column(TSVECTOR))
 
     article = relationship("Article", back_populates="chunks")
     decision = relationship("Decision", back_populates="chunks")
 
-    __table_args__ = (Index("idx_chunk_tsv", "search_vector", postgresql_using="gin"),)
+    __table_args__ = (
+        Index("idx_chunk_tsv", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_chunk_search_vector_lang",
+            "search_vector_lang",
+            postgresql_using="gin",
+        ),
+        # One graph per source type, so each search walks only its own rows
+        *(
+            Index(
+                f"ix_chunk_embedding_hnsw_{source_type}",
+                "embedding",
+                postgresql_using="hnsw",
+                postgresql_ops={"embedding": "halfvec_l2_ops"},
+                postgresql_where=text(
+                    f"active IS TRUE AND source_type = '{source_type}'"
+                ),
+            )
+            for source_type in ("article", "decision")
+        ),
+        *(
+            Index(
+                f"ix_chunk_embedding_reduced_hnsw_{source_type}",
+                "embedding_reduced",
+                postgresql_using="hnsw",
+                postgresql_ops={"embedding_reduced": "halfvec_l2_ops"},
+                postgresql_where=text(
+                    f"active IS TRUE AND source_type = '{source_type}'"
+                ),
+            )
+            for source_type in ("article", "decision")
+        ),
+        # Chunks embedded before embedding_reduced existed; empty once
+        # `embed` has filled them in, so the check on every run is cheap
+        Index(
+            "ix_chunk_embedding_reduced_missing",
+            "id",
+            postgresql_where=text(
+                "embedding IS NOT NULL AND embedding_reduced IS NULL"
+            ),
+        ),
+    )
+
+
+# Binary-quantized embedding, used as a cheap ANN prefilter. Its HNSW index
+# (ix_chunk_embedding_bq) is an expression index that autogenerate cannot
+# compare, so it lives in migrations only (see alembic/env.py).
+embedding_bits = cast(func.binary_quantize(Chunk.embedding), BIT(EMBEDDING_DIMS))
+
+
+def reduce_embedding(embedding: list[float]) -> list[float]:
+    """Truncate an embedding to its leading dimensions and L2-normalize it.
+
+    Matches l2_normalize(subvector(embedding, 1, REDUCED_EMBEDDING_DIMS)),
+    which backfills the column in SQL.
+    """
+    head = embedding[:REDUCED_EMBEDDING_DIMS]
+    norm = math.sqrt(sum(x * x for x in head))
+    return [x / norm for x in head] if norm else head
@@ -42,4 +42,8 @@ class Decision(Base):
 
     @property
     def citation(self) -> str:
-        return f"{self.number} ({self.date.year})"
+        return decision_citation(self.number, self.date)
+
+
+def decision_citation(number: str, date_: date) -> str:
+    return f"{number} ({date_.year})"
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class EmbeddingFailure(Base):
+    """Chunks whose last embedding attempt failed, removed once embedded."""
+
+    __tablename__ = "embedding_failure"
+
+    chunk_id: Mapped[int] = mapped_column(
+        ForeignKey("chunk.id", ondelete="CASCADE"), primary_key=True
+    )
+    error: Mapped[str]
+    attempts: Mapped[int] = mapped_column(server_default="1")
+    failed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
@@ -0,0 +1,27 @@
+from pgvector.sqlalchemy import HALFVEC
+from sqlalchemy import LargeBinary, func, literal
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.models.chunks import EMBEDDING_DIMS
+
+
+class EmbeddingStore(Base):
+    """Embeddings by content, kept when chunks are deleted on re-ingest so
+    identical inputs are embedded once per model (see embedding_key)."""
+
+    __tablename__ = "embedding_store"
+
+    key: Mapped[bytes] = mapped_column(LargeBinary, primary_key=True)
+    embedding: Mapped[HALFVEC] = mapped_column(HALFVEC(EMBEDDING_DIMS))
+
+
+def embedding_key(embedding_input, citation, model: str):
+    """SQL expression for the store key: sha256 of model and input.
+
+    The chunk's citation is left out of the input, since for acts without
+    an abbreviation it names the consolidation date and would change the
+    key of every chunk with each new consolidation.
+    """
+    content = func.replace(embedding_input, citation + "\n\n", "")
+    return func.sha256(func.convert_to(literal(f"{model}\n") + content, "UTF8"))
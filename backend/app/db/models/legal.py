@@ -54,6 +54,9 @@ class Article(Base):
     html: Mapped[str]
     text: Mapped[str]
     sort_order: Mapped[int] = mapped_column(index=True)
+    # False once the article is gone from the act; deleted if still gone at
+    # the next sync
+    active: Mapped[bool] = mapped_column(default=True, server_default="true")
 
     act = relationship("Act", back_populates="articles")
     chunks = relationship(
@@ -65,12 +68,26 @@ class Article(Base):
 
     @property
     def citation(self) -> str:
-        if self.number and self.act.abbr:
-            return f"{self.number} {self.act.abbr}"
-
-        sr_prefix = "SR" if self.act.lang == "de" else "RS"
-        return f"{self.number} {self.act.title} {self.act.applicability_date} ({sr_prefix} {self.act.sr_number})"
+        return article_citation(self.number, self.act)
 
     @property
     def source_url(self) -> str:
-        return f"{self.act.source_url}#{self.eid}"
+        return article_source_url(self.eid, self.act)
+
+
+# The helpers take an Act or a row with the same column names, so search
+# results can be formatted without loading the ORM objects.
+
+
+def article_citation(number: str, act) -> str:
+    if number and act.abbr:
+        return f"{number} {act.abbr}"
+
+    sr_prefix = "SR" if act.lang == "de" else "RS"
+    return (
+        f"{number} {act.title} {act.applicability_date} ({sr_prefix} {act.sr_number})"
+    )
+
+
+def article_source_url(eid: str, act) -> str:
+    return f"{act.source_url}#{eid}"
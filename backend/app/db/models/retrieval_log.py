@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class RetrievalLog(Base):
+    __tablename__ = "retrieval_log"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
+    query: Mapped[str]
+    lang: Mapped[str]
+    expanded: Mapped[dict] = mapped_column(JSONB)
+    candidates: Mapped[dict] = mapped_column(JSONB)
+    reranked: Mapped[dict] = mapped_column(JSONB)
+    timings: Mapped[dict] = mapped_column(JSONB)
+    degraded: Mapped[list] = mapped_column(JSONB)
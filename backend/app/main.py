@@ -1,15 +1,19 @@
 import logging
+from contextlib import asynccontextmanager
 
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.routing import APIRoute
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from app.api.v1.router import api_router as v1_router
 from app.core.config import settings
+from app.core.deps import verify_metrics_token
 from app.core.limiter import limiter
+from app.services.retrieval_log_service import retrieval_log
 
 # Initialize Sentry only if DSN is configured
 if settings.debug:
@@ -22,7 +26,15 @@ if settings.debug:
 if settings.sentry_dsn:
     sentry_sdk.init(dsn=settings.sentry_dsn)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Write out retrieval log entries still buffered at shutdown
+    await retrieval_log.flush()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Attach limiter to app state and add exception handler
 app.state.limiter = limiter
@@ -33,6 +45,18 @@ app.add_middleware(SlowAPIMiddleware)
 
 app.include_router(v1_router, prefix="/api")
 
+
+# Prometheus scrape endpoint (stage latencies, TTFT, cache hit rates), only
+# with METRICS_TOKEN set and sent as a bearer token
+@app.get(
+    "/metrics",
+    include_in_schema=False,
+    dependencies=[Depends(verify_metrics_token)],
+)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 for route in app.routes:
     if isinstance(route, APIRoute):
         route.operation_id = route.name
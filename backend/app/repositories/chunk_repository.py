@@ -1,83 +1,543 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import reduce
+
 from pgvector.sqlalchemy import HALFVEC
-from sqlalchemy import func, select, union_all
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import (
+    Select,
+    any_,
+    case,
+    cast,
+    func,
+    literal,
+    select,
+    true,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import DB_CHECKOUT_SECONDS
+from app.db.models import Chunk, ChunkTerm, CorpusStat, TermStat
+from app.db.models.chunks import (
+    EMBEDDING_DIMS,
+    TS_CONFIGS,
+    embedding_bits,
+    reduce_embedding,
+)
+
 
-from app.db.models import Article, Chunk
+@dataclass(frozen=True, slots=True)
+class ChunkHit:
+    """A search result: the chunk text, where it is cited from and how it
+    ranked. Read from only the columns it needs, without ORM objects."""
+
+    id: int
+    source_type: str
+    article_id: int | None
+    decision_id: int | None
+    text: str
+    citation: str
+    source_url: str | None
+    rrf_score: float
+    vector_rank: int | None
+    fts_rank: int | None
 
 
 class ChunkRepository:
-    def __init__(self, db: Session):
-        self.db = db
+    """Opens a session per search, so its connection is back in the pool
+    while the answer is generated."""
+
+    def __init__(self, session_factory: sessionmaker[Session]):
+        self.session_factory = session_factory
 
     def search_chunks(
         self,
-        query_embedding: list[float],
+        query_embedding: list[float] | None,
+        query_texts: list[str],
+        *,
+        source_type: str | None = None,
+        top_k: int = 20,
+        rrf_k: int = 60,
+    ) -> list[ChunkHit]:
+        query = _search_query(
+            query_embedding,
+            query_texts,
+            source_type=source_type,
+            top_k=top_k,
+            rrf_k=rrf_k,
+        )
+        return self._hits(query)
+
+    def search_chunks_multi(
+        self,
+        query_embedding: list[float] | None,
+        queries: dict[str, list[str]],
+        top_k: dict[str, int],
+        *,
+        rrf_k: int = 60,
+    ) -> dict[str, list[ChunkHit]]:
+        query = _search_multi_query(query_embedding, queries, top_k, rrf_k=rrf_k)
+        return _partition(self._hits(query), queries)
+
+    def _hits(self, query: Select) -> list[ChunkHit]:
+        with self.session_factory() as db:
+            with DB_CHECKOUT_SECONDS.labels("sync").time():
+                db.connection()
+            if (prepare := _session_settings(query)) is not None:
+                db.execute(prepare)
+            return [ChunkHit(**row._mapping) for row in db.execute(query)]
+
+
+class AsyncChunkRepository:
+    """Opens a session per search so concurrent searches use separate
+    pooled connections. Without a query embedding both searches fall back
+    to full-text ranking only."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        self.session_factory = session_factory
+
+    async def search_chunks(
+        self,
+        query_embedding: list[float] | None,
         query_texts: list[str],
         *,
         source_type: str | None = None,
         top_k: int = 20,
         rrf_k: int = 60,
-    ) -> list[Chunk]:
-        halfvec_embedding = Chunk.embedding.cast(HALFVEC(3584))
-        vector_distance = halfvec_embedding.l2_distance(query_embedding)
+    ) -> list[ChunkHit]:
+        query = _search_query(
+            query_embedding,
+            query_texts,
+            source_type=source_type,
+            top_k=top_k,
+            rrf_k=rrf_k,
+        )
+        return await self._hits(query)
 
-        vector_q = (
+    async def search_chunks_multi(
+        self,
+        query_embedding: list[float] | None,
+        queries: dict[str, list[str]],
+        top_k: dict[str, int],
+        *,
+        rrf_k: int = 60,
+    ) -> dict[str, list[ChunkHit]]:
+        query = _search_multi_query(query_embedding, queries, top_k, rrf_k=rrf_k)
+        return _partition(await self._hits(query), queries)
+
+    async def _hits(self, query: Select) -> list[ChunkHit]:
+        async with self.session_factory() as db:
+            with DB_CHECKOUT_SECONDS.labels("async").time():
+                await db.connection()
+            if (prepare := _session_settings(query)) is not None:
+                await db.execute(prepare)
+            return [ChunkHit(**row._mapping) for row in await db.execute(query)]
+
+
+def _search_query(
+    query_embedding: list[float] | None,
+    query_texts: list[str],
+    *,
+    source_type: str | None,
+    top_k: int,
+    rrf_k: int,
+) -> Select:
+    rank_ctes = []
+    if query_embedding is not None:
+        criteria = [_is_source_type(source_type)] if source_type else []
+        ann = _nearest(query_embedding, top_k * 2, *criteria).subquery("ann")
+        vector_q = select(
+            ann.c.chunk_id,
+            func.row_number().over(order_by=ann.c.distance).label("rank"),
+        )
+        rank_ctes.append(("vector", vector_q.cte("vector_ranks")))
+
+    rank_ctes.extend(
+        ("fts", cte)
+        for cte in _fts_rank_ctes({source_type: query_texts}, {source_type: top_k * 2})
+    )
+
+    combined = union_all(
+        *[
+            select(cte.c.chunk_id, cte.c.rank, literal(ranker).label("ranker"))
+            for ranker, cte in rank_ctes
+        ]
+    ).subquery()
+
+    rrf_scores = (
+        select(
+            combined.c.chunk_id,
+            func.sum(1.0 / (rrf_k + combined.c.rank)).label("rrf_score"),
+            *_best_ranks(combined),
+        )
+        .group_by(combined.c.chunk_id)
+        .order_by(func.sum(1.0 / (rrf_k + combined.c.rank)).desc())
+        .limit(top_k)
+        .subquery()
+    )
+
+    return (
+        _select_hits(rrf_scores)
+        .order_by(rrf_scores.c.rrf_score.desc())
+        .execution_options(
+            hnsw_ef_search=_ef_search(top_k * 2)
+            if query_embedding is not None
+            else None
+        )
+    )
+
+
+def _nearest(query_embedding: list[float], limit: int, *criteria) -> Select:
+    """Nearest active chunks as (chunk_id, source_type, distance).
+
+    With `vector_search = "binary"` or `"reduced"` a wider candidate set is
+    taken from the binary_quantize or the embedding_reduced HNSW index and
+    then re-scored with the exact halfvec distance.
+    """
+    criteria = (Chunk.active.is_(True), Chunk.embedding.isnot(None), *criteria)
+
+    if settings.vector_search == "hnsw":
+        distance = Chunk.embedding.l2_distance(query_embedding)
+        return (
             select(
                 Chunk.id.label("chunk_id"),
-                func.row_number().over(order_by=vector_distance).label("rank"),
+                Chunk.source_type,
+                distance.label("distance"),
+            )
+            .where(*criteria)
+            .order_by(distance)
+            .limit(limit)
+        )
+
+    if settings.vector_search == "binary":
+        query_bits = func.binary_quantize(
+            cast(
+                literal(query_embedding, HALFVEC(EMBEDDING_DIMS)),
+                HALFVEC(EMBEDDING_DIMS),
             )
-            .where(Chunk.active.is_(True))
-            .where(Chunk.embedding.isnot(None))
-            .order_by(vector_distance)
-            .limit(top_k * 2)
-        )
-        if source_type:
-            vector_q = vector_q.where(Chunk.source_type == source_type)
-        vector_cte = vector_q.cte("vector_ranks")
-
-        bm25_ctes = []
-        for i, query_text in enumerate(query_texts):
-            fts_query = func.plainto_tsquery("simple", query_text)
-            text_rank = func.ts_rank(Chunk.search_vector, fts_query).desc()
-
-            fts_q = (
-                select(
-                    Chunk.id.label("chunk_id"),
-                    func.row_number().over(order_by=text_rank).label("rank"),
+        )
+        prefilter = embedding_bits.op("<~>")(query_bits)
+    else:
+        prefilter = Chunk.embedding_reduced.l2_distance(
+            reduce_embedding(query_embedding)
+        )
+    candidates = (
+        select(Chunk.id, Chunk.source_type, Chunk.embedding)
+        .where(*criteria)
+        .order_by(prefilter)
+        .limit(limit * settings.rescore_factor)
+        .subquery("prefilter_candidates")
+    )
+    distance = candidates.c.embedding.l2_distance(query_embedding)
+    return (
+        select(
+            candidates.c.id.label("chunk_id"),
+            candidates.c.source_type,
+            distance.label("distance"),
+        )
+        .order_by(distance)
+        .limit(limit)
+    )
+
+
+def _bm25_ranks(query_text: str, source_type: str | None, limit: int) -> Select:
+    """Chunks matching any term of `query_text`, ranked by BM25, as
+    (chunk_id, source_type, rank).
+
+    Each query term contributes only its `bm25_term_candidates` highest-impact
+    postings, read in index order, so common terms cost no more than rare
+    ones; the candidates are then scored exactly over all query terms.
+    """
+    query_terms = func.tsvector_to_array(func.to_tsvector("simple", query_text))
+    idf = func.ln(1 + (CorpusStat.doc_count - TermStat.df + 0.5) / (TermStat.df + 0.5))
+    terms = (
+        select(TermStat.term, TermStat.source_type, idf.label("idf"))
+        .join(CorpusStat, CorpusStat.source_type == TermStat.source_type)
+        .where(TermStat.term == any_(query_terms), TermStat.df > 0)
+    )
+    if source_type:
+        terms = terms.where(TermStat.source_type == source_type)
+    terms = terms.cte()
+
+    postings = (
+        select(ChunkTerm.chunk_id)
+        .where(
+            ChunkTerm.term == terms.c.term,
+            ChunkTerm.source_type == terms.c.source_type,
+        )
+        .order_by(ChunkTerm.impact.desc())
+        .limit(settings.bm25_term_candidates)
+        .lateral()
+    )
+    candidates = (
+        select(postings.c.chunk_id, terms.c.source_type)
+        .select_from(terms)
+        .join(postings, true())
+        .distinct()
+        .subquery()
+    )
+
+    # Correlated, so each candidate costs one primary key probe per term
+    # instead of a join over the terms' full posting lists
+    score = (
+        select(func.sum(terms.c.idf * ChunkTerm.impact))
+        .where(
+            ChunkTerm.term == terms.c.term,
+            ChunkTerm.source_type == candidates.c.source_type,
+            ChunkTerm.chunk_id == candidates.c.chunk_id,
+        )
+        .scalar_subquery()
+    )
+    scored = select(candidates, score.label("score")).subquery()
+    return (
+        select(
+            scored.c.chunk_id,
+            scored.c.source_type,
+            func.row_number().over(order_by=scored.c.score.desc()).label("rank"),
+        )
+        .order_by(scored.c.score.desc())
+        .limit(limit)
+    )
+
+
+def _fts_rank_ctes(
+    queries: dict[str | None, list[str]], limits: dict[str | None, int]
+) -> list:
+    """Full-text rank lists as CTEs of (chunk_id, source_type, rank).
+
+    `queries` maps source types (None for all) to their query texts. With
+    `fts_fusion = "rrf"` each query text gets its own list; with "merged"
+    the texts of a source type are ORed into one query and ranked once.
+    ts_rank lists share one GIN scan on the OR of all tsqueries and rank the
+    matched rows only; BM25 lists each read their own bounded postings.
+    """
+    if settings.fts_fusion == "merged":
+        lists = [(st, texts) for st, texts in queries.items() if texts]
+    else:
+        lists = [(st, [text]) for st, texts in queries.items() for text in texts]
+    if not lists:
+        return []
+
+    if settings.fts_ranking == "bm25":
+        return [
+            _bm25_ranks(" ".join(texts), st, limits[st]).cte(f"fts_ranks_{i}")
+            for i, (st, texts) in enumerate(lists)
+        ]
+
+    def any_of(fts_queries):
+        return reduce(lambda a, b: a.op("||")(b), fts_queries)
+
+    search_vector = _search_vector()
+    matches = (
+        select(
+            Chunk.id.label("chunk_id"),
+            Chunk.source_type,
+            Chunk.lang,
+            search_vector.label("search_vector"),
+        )
+        .where(Chunk.active.is_(True))
+        .where(
+            search_vector.op("@@")(
+                any_of(
+                    _fts_queries(text, Chunk.lang)[0]
+                    for _, texts in lists
+                    for text in texts
                 )
-                .where(Chunk.active.is_(True))
-                .where(Chunk.search_vector.op("@@")(fts_query))
-                .order_by(text_rank)
-                .limit(top_k * 2)
             )
-            if source_type:
-                fts_q = fts_q.where(Chunk.source_type == source_type)
-            bm25_ctes.append(fts_q.cte(f"fts_ranks_{i}"))
+        )
+    )
+    if None not in queries:
+        matches = matches.where(Chunk.source_type.in_(list(queries)))
+    matches = matches.cte("fts_matches")
+
+    rank_ctes = []
+    for i, (st, texts) in enumerate(lists):
+        fts_query = any_of(_fts_queries(text, matches.c.lang)[1] for text in texts)
+        text_rank = func.ts_rank(matches.c.search_vector, fts_query).desc()
+        fts_q = (
+            select(
+                matches.c.chunk_id,
+                matches.c.source_type,
+                func.row_number().over(order_by=text_rank).label("rank"),
+            )
+            .where(matches.c.search_vector.op("@@")(fts_query))
+            .order_by(text_rank)
+            .limit(limits[st])
+        )
+        if st:
+            fts_q = fts_q.where(matches.c.source_type == st)
+        rank_ctes.append(fts_q.cte(f"fts_ranks_{i}"))
+    return rank_ctes
+
+
+def _search_vector():
+    if settings.fts_config == "language":
+        return Chunk.search_vector_lang
+    return Chunk.search_vector
+
+
+def _fts_queries(query_text: str, lang_column):
+    """tsqueries for `query_text` as (any_query, row_query).
+
+    `any_query` is usable by the GIN index. With language vectors it ORs the
+    query stemmed in every configuration, and `row_query` then picks the one
+    that matches each row's `lang_column`.
+    """
+    if settings.fts_config == "simple":
+        fts_query = func.plainto_tsquery("simple", query_text)
+        return fts_query, fts_query
+
+    per_config = {
+        lang: func.plainto_tsquery(config, query_text)
+        for lang, config in TS_CONFIGS.items()
+    }
+    simple = func.plainto_tsquery("simple", query_text)
+    any_query = reduce(lambda a, b: a.op("||")(b), [*per_config.values(), simple])
+    return any_query, case(per_config, value=lang_column, else_=simple)
 
-        combined = union_all(
-            select(vector_cte.c.chunk_id, vector_cte.c.rank),
-            *[select(cte.c.chunk_id, cte.c.rank) for cte in bm25_ctes],
-        ).subquery()
 
-        rrf_scores = (
+def _is_source_type(source_type: str):
+    # Rendered inline so the planner can match the partial HNSW index for
+    # this source type even when the statement is prepared.
+    return Chunk.source_type == literal(source_type, literal_execute=True)
+
+
+def _ef_search(ann_limit: int) -> int:
+    # An HNSW scan yields at most ef_search rows, so it must cover the
+    # largest candidate set of the query (pgvector caps it at 1000).
+    if settings.vector_search != "hnsw":
+        ann_limit *= settings.rescore_factor
+    return min(1000, max(settings.hnsw_ef_search, ann_limit))
+
+
+def _session_settings(query: Select) -> Select | None:
+    """Transaction-local statement timeout and the HNSW settings requested
+    by a search query."""
+    configs = []
+    if settings.db_statement_timeout:
+        timeout_ms = round(settings.db_statement_timeout * 1000)
+        configs.append(func.set_config("statement_timeout", str(timeout_ms), True))
+    ef_search = query.get_execution_options().get("hnsw_ef_search")
+    if ef_search is not None:
+        configs += [
+            func.set_config("hnsw.ef_search", str(ef_search), True),
+            func.set_config("hnsw.iterative_scan", settings.hnsw_iterative_scan, True),
+        ]
+    return select(*configs) if configs else None
+
+
+def _search_multi_query(
+    query_embedding: list[float] | None,
+    queries: dict[str, list[str]],
+    top_k: dict[str, int],
+    *,
+    rrf_k: int,
+) -> Select:
+    """Hybrid search over several source types in one statement.
+
+    Each source type gets its own ANN scan on its partial HNSW index; see
+    _fts_rank_ctes for the full-text side.
+    """
+    source_types = list(queries)
+
+    def per_source(limits: dict[str, int], column):
+        return case(limits, value=column, else_=0)
+
+    rank_ctes = []
+    if query_embedding is not None:
+        for source_type in source_types:
+            ann = _nearest(
+                query_embedding, top_k[source_type] * 2, _is_source_type(source_type)
+            ).subquery(f"ann_{source_type}")
+            vector_cte = select(
+                ann.c.chunk_id,
+                ann.c.source_type,
+                func.row_number().over(order_by=ann.c.distance).label("rank"),
+            ).cte(f"vector_ranks_{source_type}")
+            rank_ctes.append(("vector", vector_cte))
+
+    rank_ctes.extend(
+        ("fts", cte)
+        for cte in _fts_rank_ctes(
+            queries, {st: limit * 2 for st, limit in top_k.items()}
+        )
+    )
+
+    combined = union_all(
+        *[
             select(
-                combined.c.chunk_id,
-                func.sum(1.0 / (rrf_k + combined.c.rank)).label("rrf_score"),
+                cte.c.chunk_id,
+                cte.c.source_type,
+                cte.c.rank,
+                literal(ranker).label("ranker"),
             )
-            .group_by(combined.c.chunk_id)
-            .order_by(func.sum(1.0 / (rrf_k + combined.c.rank)).desc())
-            .limit(top_k)
-            .subquery()
-        )
-
-        return list(
-            self.db.scalars(
-                select(Chunk)
-                .join(rrf_scores, Chunk.id == rrf_scores.c.chunk_id)
-                .options(
-                    selectinload(Chunk.article).selectinload(Article.act),
-                    selectinload(Chunk.decision),
-                )
-                .order_by(rrf_scores.c.rrf_score.desc())
-            ).all()
+            for ranker, cte in rank_ctes
+        ]
+    ).subquery()
+
+    rrf_score = func.sum(1.0 / (rrf_k + combined.c.rank))
+    rrf_scores = (
+        select(
+            combined.c.chunk_id,
+            combined.c.source_type,
+            rrf_score.label("rrf_score"),
+            *_best_ranks(combined),
+            func.row_number()
+            .over(partition_by=combined.c.source_type, order_by=rrf_score.desc())
+            .label("position"),
+        )
+        .group_by(combined.c.chunk_id, combined.c.source_type)
+        .subquery()
+    )
+
+    return (
+        _select_hits(rrf_scores)
+        .where(rrf_scores.c.position <= per_source(top_k, rrf_scores.c.source_type))
+        .order_by(rrf_scores.c.source_type, rrf_scores.c.position)
+        .execution_options(
+            hnsw_ef_search=_ef_search(max(top_k.values()) * 2)
+            if query_embedding is not None
+            else None
         )
+    )
+
+
+def _best_ranks(combined) -> list:
+    """Best vector and full-text rank per chunk, kept for retrieval logging."""
+    return [
+        func.min(combined.c.rank)
+        .filter(combined.c.ranker == ranker)
+        .label(f"{ranker}_rank")
+        for ranker in ("vector", "fts")
+    ]
+
+
+def _select_hits(rrf_scores) -> Select:
+    """The ChunkHit columns of the ranked chunks."""
+    return (
+        select(
+            Chunk.id,
+            Chunk.source_type,
+            Chunk.article_id,
+            Chunk.decision_id,
+            Chunk.text,
+            Chunk.citation,
+            Chunk.source_url,
+            rrf_scores.c.rrf_score,
+            rrf_scores.c.vector_rank,
+            rrf_scores.c.fts_rank,
+        )
+        .select_from(rrf_scores)
+        .join(Chunk, Chunk.id == rrf_scores.c.chunk_id)
+    )
+
+
+def _partition(
+    hits: Sequence[ChunkHit], queries: dict[str, list[str]]
+) -> dict[str, list[ChunkHit]]:
+    results: dict[str, list[ChunkHit]] = {source_type: [] for source_type in queries}
+    for hit in hits:
+        results[hit.source_type].append(hit)
+    return results
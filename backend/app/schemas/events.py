@@ -21,7 +21,7 @@ class Error(BaseModel):
 class Source(BaseModel):
     id: int
     citation: str
-    url: str
+    url: str | None
 
 
 class Status(BaseModel):
@@ -34,4 +34,9 @@ class Sources(BaseModel):
     sources: list[Source]
 
 
-Event = TextDelta | ThinkingDelta | Status | Error | Sources
+class Metadata(BaseModel):
+    type: Literal["metadata"]
+    degraded: list[str]
+
+
+Event = TextDelta | ThinkingDelta | Status | Error | Sources | Metadata
@@ -1,24 +1,66 @@
+import asyncio
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from typing import Iterator
+from typing import AsyncIterator, Awaitable, Callable, Iterator, TypeVar
 
 import sentry_sdk
 
 from app.core.config import settings
+from app.core.metrics import STAGE_DEGRADED, StreamMetrics, stage
 from app.core.types import Language
-from app.db.models import Chunk
-from app.repositories.chunk_repository import ChunkRepository
+from app.repositories.chunk_repository import (
+    AsyncChunkRepository,
+    ChunkHit,
+    ChunkRepository,
+)
 from app.schemas.chat import Message
-from app.schemas.events import Error, Event, Source, Sources, Status
-from app.services.embedding_service import EmbeddingService
-from app.services.llm_service import LLMService
-from app.services.query_expansion_service import QueryExpansionService
-from app.services.reranker_service import RerankerService
+from app.schemas.events import Error, Event, Metadata, Source, Sources, Status
+from app.schemas.query import ExpandedQueries
+from app.services.embedding_service import AsyncEmbeddingService, EmbeddingService
+from app.services.llm_service import AsyncLLMService, LLMService
+from app.services.query_expansion_service import (
+    AsyncQueryExpansionService,
+    QueryExpansionService,
+)
+from app.services.reranker_service import AsyncRerankerService, RerankerService
+from app.services.retrieval_log_service import RetrievalLogService, RetrievalTrace
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-class ChatService:
+_PHASE_STATUS = {"thinking_delta": "thinking", "text_delta": "generating"}
+
+
+class BaseChatService:
+    def _build_context(self, chunks: list[ChunkHit]) -> str:
+        return "\n---\n".join(f"ID: {c.id}\n\n{c.text}" for c in chunks)
+
+    def _phase_status(self, event: Event, started: set[str]) -> Status | None:
+        status = _PHASE_STATUS.get(event.type)
+        if status is None or status in started:
+            return None
+        started.add(status)
+        return Status(type="status", status=status)
+
+    def _build_sources_event(
+        self, article_chunks: list[ChunkHit], decision_chunks: list[ChunkHit]
+    ) -> Sources:
+        sources: list[Source] = []
+
+        for c in [*article_chunks, *decision_chunks]:
+            sources.append(
+                Source(
+                    id=c.id,
+                    citation=c.citation,
+                    url=c.source_url,
+                )
+            )
+
+        return Sources(type="sources", sources=sources)
+
+
+class ChatService(BaseChatService):
     def __init__(
         self,
         chunk_repo: ChunkRepository,
@@ -36,12 +78,19 @@ class ChatService:
     def process_message(
         self, *, messages: list[Message], model: str, lang: Language
     ) -> Iterator[Event]:
+        stream = StreamMetrics("sync")
         try:
-            yield from self._process_message(messages=messages, model=model, lang=lang)
+            for event in self._process_message(
+                messages=messages, model=model, lang=lang
+            ):
+                stream.observe(event.type)
+                yield event
         except Exception as e:
             logger.exception("Error processing message")
             sentry_sdk.capture_exception()
             yield Error(type="error", message=str(e))
+        finally:
+            stream.finish()
 
     def _process_message(
         self, *, messages: list[Message], model: str, lang: Language
@@ -88,53 +137,285 @@ class ChatService:
 
         yield Status(type="status", status="done")
 
-    def _build_context(self, chunks: list[Chunk]) -> str:
-        return "\n---\n".join(f"ID: {c.id}\n\n{c.text}" for c in chunks)
-
     def _generate(
         self, *, messages: list[Message], context: str, model: str, lang: Language
     ) -> Iterator[Event]:
-        thinking_started = False
-        generating_started = False
+        started: set[str] = set()
 
         for event in self.llm_service.generate(
             messages=messages, context=context, model=model, lang=lang
         ):
-            match event.type:
-                case "thinking_delta":
-                    if not thinking_started:
-                        yield Status(type="status", status="thinking")
-                        thinking_started = True
-                    yield event
-                case "text_delta":
-                    if not generating_started:
-                        yield Status(type="status", status="generating")
-                        generating_started = True
-                    yield event
+            if status := self._phase_status(event, started):
+                yield status
+            yield event
 
-    def _build_sources_event(
-        self, article_chunks: list[Chunk], decision_chunks: list[Chunk]
-    ) -> Sources:
-        sources: list[Source] = []
 
-        for c in article_chunks:
-            a = c.article
-            sources.append(
-                Source(
-                    id=c.id,
-                    citation=a.citation,
-                    url=a.source_url,
-                )
+class AsyncChatService(BaseChatService):
+    def __init__(
+        self,
+        chunk_repo: AsyncChunkRepository,
+        embedding_service: AsyncEmbeddingService,
+        llm_service: AsyncLLMService,
+        query_expansion_service: AsyncQueryExpansionService,
+        reranker: AsyncRerankerService,
+        retrieval_log: RetrievalLogService | None = None,
+    ):
+        self.chunk_repo = chunk_repo
+        self.embedding_service = embedding_service
+        self.llm_service = llm_service
+        self.query_expansion_service = query_expansion_service
+        self.reranker = reranker
+        self.retrieval_log = retrieval_log
+
+    async def process_message(
+        self, *, messages: list[Message], model: str, lang: Language
+    ) -> AsyncIterator[Event]:
+        stream = StreamMetrics("async")
+        try:
+            async for event in self._process_message(
+                messages=messages, model=model, lang=lang
+            ):
+                stream.observe(event.type)
+                yield event
+        except Exception as e:
+            logger.exception("Error processing message")
+            sentry_sdk.capture_exception()
+            yield Error(type="error", message=str(e))
+        finally:
+            stream.finish()
+
+    async def _process_message(
+        self, *, messages: list[Message], model: str, lang: Language
+    ) -> AsyncIterator[Event]:
+        yield Status(type="status", status="searching")
+
+        query = messages[-1].content
+        articles, decisions, trace = await self.retrieve(query, lang)
+
+        yield self._build_sources_event(articles, decisions)
+        yield Metadata(type="metadata", degraded=trace.degraded)
+
+        if self.retrieval_log is not None:
+            self.retrieval_log.record(trace)
+
+        context = self._build_context(articles + decisions)
+
+        async for event in self._generate(
+            messages=messages, context=context, model=model, lang=lang
+        ):
+            yield event
+
+        yield Status(type="status", status="done")
+
+    async def retrieve(
+        self, query: str, lang: Language
+    ) -> tuple[list[ChunkHit], list[ChunkHit], RetrievalTrace]:
+        """Expansion, embedding, hybrid search and rerank for one query."""
+        trace = RetrievalTrace(query=query, lang=lang)
+
+        with stage("embedding+expansion", trace.timings):
+            query_embedding, expanded = await asyncio.gather(
+                _within_budget(
+                    "embedding",
+                    lambda: self.embedding_service.embed_text(query),
+                    timeout=settings.embedding_timeout,
+                    fallback=None,
+                    trace=trace,
+                ),
+                _within_budget(
+                    "expansion",
+                    lambda: self.query_expansion_service.expand(query, lang),
+                    timeout=settings.expansion_timeout,
+                    hedge_after=settings.expansion_hedge_after,
+                    fallback=ExpandedQueries(
+                        article_queries=[query], decision_queries=[query]
+                    ),
+                    trace=trace,
+                ),
             )
+        trace.expanded = expanded.model_dump()
 
-        for c in decision_chunks:
-            d = c.decision
-            sources.append(
-                Source(
-                    id=c.id,
-                    citation=d.citation,
-                    url=d.source_url,
-                )
+        with stage("retrieval", trace.timings):
+            articles, decisions = await self._retrieve_all(
+                query, query_embedding, expanded, trace
             )
+        return articles, decisions, trace
 
-        return Sources(type="sources", sources=sources)
+    async def _retrieve_all(
+        self,
+        query: str,
+        query_embedding: list[float] | None,
+        expanded: ExpandedQueries,
+        trace: RetrievalTrace,
+    ) -> tuple[list[ChunkHit], list[ChunkHit]]:
+        queries = {
+            "article": expanded.article_queries,
+            "decision": expanded.decision_queries,
+        }
+        top_k = {
+            "article": settings.rerank_article_candidates,
+            "decision": settings.rerank_decision_candidates,
+        }
+        top_n = {
+            "article": settings.search_article_top_k,
+            "decision": settings.search_decision_top_k,
+        }
+
+        if settings.search_strategy == "combined":
+            results = await _within_budget(
+                "search[combined]",
+                lambda: self.chunk_repo.search_chunks_multi(
+                    query_embedding, queries, top_k
+                ),
+                timeout=settings.search_timeout,
+                fallback={st: [] for st in queries},
+                trace=trace,
+            )
+            for st, chunks in results.items():
+                trace.add_candidates(st, chunks)
+            articles, decisions = await asyncio.gather(
+                *[
+                    self._rerank(
+                        query,
+                        results[st],
+                        source_type=st,
+                        top_n=top_n[st],
+                        trace=trace,
+                    )
+                    for st in ("article", "decision")
+                ]
+            )
+        else:
+            articles, decisions = await asyncio.gather(
+                *[
+                    self._retrieve(
+                        query,
+                        query_embedding,
+                        queries[st],
+                        source_type=st,
+                        top_k=top_k[st],
+                        top_n=top_n[st],
+                        trace=trace,
+                    )
+                    for st in ("article", "decision")
+                ]
+            )
+        return articles, decisions
+
+    async def _retrieve(
+        self,
+        query: str,
+        query_embedding: list[float] | None,
+        query_texts: list[str],
+        *,
+        source_type: str,
+        top_k: int,
+        top_n: int,
+        trace: RetrievalTrace,
+    ) -> list[ChunkHit]:
+        chunks = await _within_budget(
+            f"search[{source_type}]",
+            lambda: self.chunk_repo.search_chunks(
+                query_embedding,
+                query_texts,
+                source_type=source_type,
+                top_k=top_k,
+            ),
+            timeout=settings.search_timeout,
+            fallback=[],
+            trace=trace,
+        )
+        trace.add_candidates(source_type, chunks)
+        return await self._rerank(
+            query, chunks, source_type=source_type, top_n=top_n, trace=trace
+        )
+
+    async def _rerank(
+        self,
+        query: str,
+        chunks: list[ChunkHit],
+        *,
+        source_type: str,
+        top_n: int,
+        trace: RetrievalTrace,
+    ) -> list[ChunkHit]:
+        # On timeout keep the RRF order from the search.
+        chunks = await _within_budget(
+            f"rerank[{source_type}]",
+            lambda: self.reranker.rerank(query, chunks, top_n=top_n),
+            timeout=settings.rerank_timeout,
+            hedge_after=settings.rerank_hedge_after,
+            fallback=chunks[:top_n],
+            trace=trace,
+        )
+        trace.add_reranked(source_type, chunks)
+        return chunks
+
+    async def _generate(
+        self, *, messages: list[Message], context: str, model: str, lang: Language
+    ) -> AsyncIterator[Event]:
+        started: set[str] = set()
+
+        async for event in self.llm_service.generate(
+            messages=messages, context=context, model=model, lang=lang
+        ):
+            if status := self._phase_status(event, started):
+                yield status
+            yield event
+
+
+async def _within_budget(
+    name: str,
+    call: Callable[[], Awaitable[T]],
+    *,
+    timeout: float,
+    fallback: T,
+    trace: RetrievalTrace,
+    hedge_after: float = 0,
+) -> T:
+    """Run and time a stage under its deadline, returning `fallback` on expiry
+    or when the call fails.
+
+    The pending call is cancelled, so a late result is discarded.
+    """
+    try:
+        with stage(name, trace.timings):
+            if hedge_after:
+                return await asyncio.wait_for(
+                    _hedged(call, hedge_after), timeout or None
+                )
+            return await asyncio.wait_for(call(), timeout or None)
+    except TimeoutError:
+        logger.warning("%s exceeded its %.2fs budget, falling back", name, timeout)
+    except Exception:
+        logger.warning("%s failed, falling back", name, exc_info=True)
+        sentry_sdk.capture_exception()
+    STAGE_DEGRADED.labels(name).inc()
+    trace.degraded.append(name)
+    return fallback
+
+
+async def _hedged(call: Callable[[], Awaitable[T]], delay: float) -> T:
+    """Start a second identical call if the first has not succeeded after
+    `delay` seconds and return the first successful result.
+
+    Raises the last error only when both calls fail.
+    """
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        await asyncio.wait(tasks, timeout=delay)
+        if tasks[0].done() and tasks[0].exception() is None:
+            return tasks[0].result()
+        tasks.append(asyncio.ensure_future(call()))
+        pending = {task for task in tasks if not task.done()}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        return tasks[-1].result()
+    finally:
+        for task in tasks:
+            task.cancel()
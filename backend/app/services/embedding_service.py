@@ -1,5 +1,8 @@
-from openai import OpenAI
+import struct
 
+from openai import AsyncOpenAI, OpenAI
+
+from app.core.cache import TieredCache, hash_key, normalize_key_text
 from app.core.config import settings
 
 
@@ -18,3 +21,44 @@ class EmbeddingService:
             input=texts, model=settings.openai_embedding_model
         )
         return [d.embedding for d in response.data]
+
+
+class AsyncEmbeddingService:
+    def __init__(self, client: AsyncOpenAI, cache: TieredCache | None = None):
+        self.client = client
+        self.cache = cache
+
+    async def embed_text(self, text: str) -> list[float]:
+        if self.cache is None:
+            return await self._embed_text(text)
+
+        key = hash_key(settings.openai_embedding_model, normalize_key_text(text))
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return _unpack(cached)
+
+        embedding = await self._embed_text(text)
+        await self.cache.set(key, _pack(embedding))
+        return embedding
+
+    async def _embed_text(self, text: str) -> list[float]:
+        response = await self.client.embeddings.create(
+            input=text, model=settings.openai_embedding_model
+        )
+        return response.data[0].embedding
+
+    async def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        response = await self.client.embeddings.create(
+            input=texts, model=settings.openai_embedding_model
+        )
+        return [d.embedding for d in response.data]
+
+
+# Cached vectors are stored as float16, the precision search compares at
+# (halfvec), which halves the footprint in both cache tiers.
+def _pack(embedding: list[float]) -> bytes:
+    return struct.pack(f"<{len(embedding)}e", *embedding)
+
+
+def _unpack(data: bytes) -> list[float]:
+    return list(struct.unpack(f"<{len(data) // 2}e", data))
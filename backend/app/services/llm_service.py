@@ -1,6 +1,7 @@
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletionChunk
 
 from app.core.config import settings
 from app.core.types import Language
@@ -21,30 +22,67 @@ class LLMService:
         model: str,
         lang: Language,
     ) -> Iterator[Event]:
-        openai_messages: list[dict] = [
-            {
-                "role": "system",
-                "content": build_instructions(lang=lang, context=context),
-            },
-            *[{"role": msg.role, "content": msg.content} for msg in messages],
-        ]
-
         stream = self.client.chat.completions.create(
             model=model,
-            messages=openai_messages,  # type: ignore
+            messages=_build_messages(messages, context, lang),  # type: ignore
             stream=True,
             extra_body={"reasoning_effort": settings.openai_reasoning_effort},
         )
 
         for chunk in stream:
-            if not chunk.choices:
-                continue
+            event = _to_event(chunk)
+            if event:
+                yield event
+
+
+class AsyncLLMService:
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+
+    async def generate(
+        self,
+        *,
+        messages: list[Message],
+        context: str,
+        model: str,
+        lang: Language,
+    ) -> AsyncIterator[Event]:
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=_build_messages(messages, context, lang),  # type: ignore
+            stream=True,
+            extra_body={"reasoning_effort": settings.openai_reasoning_effort},
+        )
+
+        async for chunk in stream:
+            event = _to_event(chunk)
+            if event:
+                yield event
+
+
+def _build_messages(
+    messages: list[Message], context: str, lang: Language
+) -> list[dict]:
+    return [
+        {
+            "role": "system",
+            "content": build_instructions(lang=lang, context=context),
+        },
+        *[{"role": msg.role, "content": msg.content} for msg in messages],
+    ]
+
+
+def _to_event(chunk: ChatCompletionChunk) -> Event | None:
+    if not chunk.choices:
+        return None
+
+    delta = chunk.choices[0].delta
 
-            delta = chunk.choices[0].delta
+    reasoning_content = getattr(delta, "reasoning_content", None)
+    if reasoning_content:
+        return ThinkingDelta(type="thinking_delta", delta=reasoning_content)
 
-            reasoning_content = getattr(delta, "reasoning_content", None)
-            if reasoning_content:
-                yield ThinkingDelta(type="thinking_delta", delta=reasoning_content)
+    if delta.content:
+        return TextDelta(type="text_delta", delta=delta.content)
 
-            elif delta.content:
-                yield TextDelta(type="text_delta", delta=delta.content)
+    return None
@@ -3,8 +3,9 @@ import logging
 import time
 
 import sentry_sdk
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
+from app.core.cache import TieredCache, hash_key, normalize_key_text
 from app.core.config import settings
 from app.core.types import Language
 from app.schemas.query import ExpandedQueries
@@ -26,6 +27,9 @@ GmbH/Gesellschaft mit beschraenkter Haftung, SA/societe anonyme)
 - Return JSON: {"article_queries": [...], "decision_queries": [...]}
 """
 
+# Part of every cache key, so editing the prompt invalidates old expansions.
+PROMPT_HASH = hash_key(SYSTEM_PROMPT)[:16]
+
 
 class QueryExpansionService:
     def __init__(self, client: OpenAI):
@@ -37,63 +41,115 @@ class QueryExpansionService:
         except Exception:
             logger.exception("Query expansion failed, using original query")
             sentry_sdk.capture_exception()
-            return ExpandedQueries(article_queries=[query], decision_queries=[query])
+            return _fallback(query)
 
     def _expand(self, query: str, lang: Language) -> ExpandedQueries:
-        model = settings.query_expansion_model or settings.openai_chat_model
         t0 = time.perf_counter()
         response = self.client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {
-                    "role": "user",
-                    "content": f"Language: {lang}\nQuery: {query}",
-                },
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "expanded_queries",
-                    "strict": True,
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "article_queries": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                            },
-                            "decision_queries": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                            },
+            **_completion_kwargs(query, lang)
+        )
+        return _parse_response(query, response.choices[0].message.content, t0)
+
+
+class AsyncQueryExpansionService:
+    def __init__(self, client: AsyncOpenAI, cache: TieredCache | None = None):
+        self.client = client
+        self.cache = cache
+
+    async def expand(self, query: str, lang: Language) -> ExpandedQueries:
+        # Errors propagate: AsyncChatService falls back to the original
+        # query and reports the stage as degraded
+        if self.cache is None:
+            return await self._expand(query, lang)
+        return await self._expand_cached(query, lang)
+
+    async def _expand_cached(self, query: str, lang: Language) -> ExpandedQueries:
+        key = hash_key(normalize_key_text(query), lang, _expansion_model(), PROMPT_HASH)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            if settings.debug:
+                logger.info(
+                    "Query expansion cache hit [%s] (hit rate %.0f%%)",
+                    query,
+                    self.cache.stats.hit_rate * 100,
+                )
+            return ExpandedQueries.model_validate_json(cached)
+
+        result = await self._expand(query, lang)
+        await self.cache.set(key, result.model_dump_json().encode())
+        return result
+
+    async def _expand(self, query: str, lang: Language) -> ExpandedQueries:
+        t0 = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            **_completion_kwargs(query, lang)
+        )
+        return _parse_response(query, response.choices[0].message.content, t0)
+
+
+def _fallback(query: str) -> ExpandedQueries:
+    return ExpandedQueries(article_queries=[query], decision_queries=[query])
+
+
+def _expansion_model() -> str:
+    return settings.query_expansion_model or settings.openai_chat_model
+
+
+def _completion_kwargs(query: str, lang: Language) -> dict:
+    return {
+        "model": _expansion_model(),
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"Language: {lang}\nQuery: {query}",
+            },
+        ],
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "expanded_queries",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "article_queries": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                        },
+                        "decision_queries": {
+                            "type": "array",
+                            "items": {"type": "string"},
                         },
-                        "required": ["article_queries", "decision_queries"],
-                        "additionalProperties": False,
                     },
+                    "required": ["article_queries", "decision_queries"],
+                    "additionalProperties": False,
                 },
             },
-            temperature=0.3,
-        )
+        },
+        "temperature": 0.3,
+    }
 
-        data = json.loads(response.choices[0].message.content)
-        result = ExpandedQueries(
-            article_queries=data["article_queries"][:3],
-            decision_queries=data["decision_queries"][:3],
-        )
 
-        if not result.article_queries:
-            result.article_queries = [query]
-        if not result.decision_queries:
-            result.decision_queries = [query]
-
-        if settings.debug:
-            elapsed = time.perf_counter() - t0
-            logger.info(
-                "Query expansion took %.2fs [%s] -> articles=%s, decisions=%s",
-                elapsed,
-                query,
-                result.article_queries,
-                result.decision_queries,
-            )
-        return result
+def _parse_response(query: str, content: str, t0: float) -> ExpandedQueries:
+    data = json.loads(content)
+    result = ExpandedQueries(
+        article_queries=data["article_queries"][:3],
+        decision_queries=data["decision_queries"][:3],
+    )
+
+    if not result.article_queries:
+        result.article_queries = [query]
+    if not result.decision_queries:
+        result.decision_queries = [query]
+
+    if settings.debug:
+        elapsed = time.perf_counter() - t0
+        logger.info(
+            "Query expansion took %.2fs [%s] -> articles=%s, decisions=%s",
+            elapsed,
+            query,
+            result.article_queries,
+            result.decision_queries,
+        )
+    return result
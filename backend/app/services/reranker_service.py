@@ -1,11 +1,13 @@
 import logging
+import struct
 import time
 
 import cohere
 import sentry_sdk
 
+from app.core.cache import TieredCache, hash_key, normalize_key_text
 from app.core.config import settings
-from app.db.models import Chunk
+from app.repositories.chunk_repository import ChunkHit
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +16,7 @@ class RerankerService:
     def __init__(self, client: cohere.ClientV2):
         self.client = client
 
-    def rerank(self, query: str, chunks: list[Chunk], top_n: int) -> list[Chunk]:
+    def rerank(self, query: str, chunks: list[ChunkHit], top_n: int) -> list[ChunkHit]:
         if not chunks:
             return chunks
 
@@ -26,14 +28,93 @@ class RerankerService:
                 model=settings.cohere_rerank_model,
                 top_n=top_n,
             )
-            logger.info(
-                "Rerank took %.2fs (%d -> %d chunks)",
-                time.perf_counter() - t0,
-                len(chunks),
-                top_n,
-            )
+            _log_timing(t0, len(chunks), top_n)
             return [chunks[r.index] for r in response.results]
         except Exception:
             logger.warning("Reranking failed, returning original chunks", exc_info=True)
             sentry_sdk.capture_exception()
             return chunks
+
+
+class AsyncRerankerService:
+    def __init__(self, client: cohere.AsyncClientV2, cache: TieredCache | None = None):
+        self.client = client
+        self.cache = cache
+
+    async def rerank(
+        self, query: str, chunks: list[ChunkHit], top_n: int
+    ) -> list[ChunkHit]:
+        if not chunks:
+            return chunks
+
+        # Errors propagate: AsyncChatService falls back to the top_n RRF
+        # candidates and reports the stage as degraded
+        if self.cache is None:
+            response = await self._rerank(query, chunks, top_n)
+            return [chunks[r.index] for r in response.results]
+        return await self._rerank_cached(query, chunks, top_n)
+
+    async def _rerank_cached(
+        self, query: str, chunks: list[ChunkHit], top_n: int
+    ) -> list[ChunkHit]:
+        """Score only candidates without a cached (query, chunk) score.
+
+        Relevance scores are per query-document pair, so cached and fresh
+        scores can be merged and sorted locally.
+        """
+        query_hash = hash_key(normalize_key_text(query))
+        keys = [
+            hash_key(query_hash, str(c.id), settings.cohere_rerank_model)
+            for c in chunks
+        ]
+        scores = [
+            _unpack_score(v) if v is not None else None
+            for v in await self.cache.get_many(keys)
+        ]
+
+        uncached = [i for i, score in enumerate(scores) if score is None]
+        if uncached:
+            response = await self._rerank(
+                query, [chunks[i] for i in uncached], len(uncached)
+            )
+            fresh = {}
+            for r in response.results:
+                i = uncached[r.index]
+                scores[i] = r.relevance_score
+                fresh[keys[i]] = _pack_score(r.relevance_score)
+            await self.cache.set_many(fresh)
+
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score is not None),
+            key=lambda i: scores[i],
+            reverse=True,
+        )
+        return [chunks[i] for i in ranked[:top_n]]
+
+    async def _rerank(self, query: str, chunks: list[ChunkHit], top_n: int):
+        t0 = time.perf_counter()
+        response = await self.client.rerank(
+            query=query,
+            documents=[c.text for c in chunks],
+            model=settings.cohere_rerank_model,
+            top_n=top_n,
+        )
+        _log_timing(t0, len(chunks), top_n)
+        return response
+
+
+def _log_timing(t0: float, n_chunks: int, top_n: int) -> None:
+    logger.info(
+        "Rerank took %.2fs (%d -> %d chunks)",
+        time.perf_counter() - t0,
+        n_chunks,
+        top_n,
+    )
+
+
+def _pack_score(score: float) -> bytes:
+    return struct.pack("<f", score)
+
+
+def _unpack_score(data: bytes) -> float:
+    return struct.unpack("<f", data)[0]
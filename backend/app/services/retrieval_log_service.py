@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import RETRIEVAL_LOG_DROPPED
+from app.db.models import RetrievalLog
+from app.db.session import AsyncSessionLocal
+from app.repositories.chunk_repository import ChunkHit
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetrievalTrace:
+    """What one chat request retrieved, filled in as the pipeline runs."""
+
+    query: str
+    lang: str
+    expanded: dict[str, list[str]] = field(default_factory=dict)
+    candidates: dict[str, list[dict]] = field(default_factory=dict)
+    reranked: dict[str, list[int]] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+    degraded: list[str] = field(default_factory=list)
+
+    def add_candidates(self, source_type: str, chunks: list[ChunkHit]) -> None:
+        self.candidates[source_type] = [
+            {
+                "id": c.id,
+                "source_id": getattr(c, f"{source_type}_id"),
+                "rrf_rank": position,
+                "rrf_score": c.rrf_score,
+                "vector_rank": c.vector_rank,
+                "fts_rank": c.fts_rank,
+            }
+            for position, c in enumerate(chunks, start=1)
+        ]
+
+    def add_reranked(self, source_type: str, chunks: list[ChunkHit]) -> None:
+        self.reranked[source_type] = [c.id for c in chunks]
+
+
+class RetrievalLogService:
+    """Buffers retrieval traces in memory and bulk-inserts them from a
+    background task, so recording never waits on the database.
+
+    Traces are dropped when the buffer is full or a write fails, and
+    counted in RETRIEVAL_LOG_DROPPED.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        flush_interval: float,
+        max_pending: int,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: list[dict] = []
+        self._task: asyncio.Task | None = None
+
+    def record(self, trace: RetrievalTrace) -> None:
+        if len(self._pending) >= self.max_pending:
+            RETRIEVAL_LOG_DROPPED.labels("full").inc()
+            return
+        self._pending.append(asdict(trace))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def flush(self) -> None:
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        try:
+            async with self.session_factory() as db:
+                await db.execute(insert(RetrievalLog), rows)
+                await db.commit()
+        except Exception:
+            RETRIEVAL_LOG_DROPPED.labels("write_failed").inc(len(rows))
+            logger.warning(
+                "Failed to write %d retrieval log entries", len(rows), exc_info=True
+            )
+
+    async def _run(self) -> None:
+        # Exits once the buffer is empty; record() starts a new task.
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+retrieval_log = RetrievalLogService(
+    AsyncSessionLocal,
+    flush_interval=settings.retrieval_log_flush_interval,
+    max_pending=settings.retrieval_log_max_pending,
+)
@@ -1,7 +1,7 @@
 import click
-from sqlalchemy import select
+from sqlalchemy import select, update
 
-from app.db.models import Act
+from app.db.models import Act, Chunk
 from app.db.session import SessionLocal
 from cli.utils import sparql
 
@@ -38,6 +38,12 @@ def backfill_source_url(lang: str, sr_number: str | None, force: bool):
                 continue
 
             act.source_url = row.source_url
+            for article in act.articles:
+                db.execute(
+                    update(Chunk)
+                    .where(Chunk.article_id == article.id)
+                    .values(source_url=article.source_url)
+                )
             updated += 1
             click.echo(f"  {act.label}: updated")
 
@@ -0,0 +1,85 @@
+import click
+from sqlalchemy import Integer, String, column, func, select, update, values
+
+from app.db.models import Act, Article, Chunk, Decision
+from app.db.models.decisions import decision_citation
+from app.db.models.legal import article_citation, article_source_url
+from app.db.session import SessionLocal
+
+
+@click.command(name="backfill-chunk-sources")
+@click.option("--batch-size", default=2000, show_default=True)
+def backfill_chunk_sources(batch_size: int):
+    """Recompute the citation and source_url of each chunk from its article
+    or decision.
+
+    Migration d5b9e3f7a124 fills them initially; run this after changing
+    how citations are formatted. Each batch commits on its own.
+    """
+    with SessionLocal() as db:
+        total = db.scalar(select(func.count(Chunk.id)))
+        click.echo(f"Found {total} chunks to backfill")
+
+        last_id = 0
+        updated = 0
+        while True:
+            q = (
+                select(
+                    Chunk.id,
+                    Chunk.article_id,
+                    Article.number,
+                    Article.eid,
+                    Act.abbr,
+                    Act.title,
+                    Act.lang,
+                    Act.applicability_date,
+                    Act.sr_number,
+                    Act.source_url,
+                    Decision.number.label("decision_number"),
+                    Decision.date.label("decision_date"),
+                    Decision.source_url.label("decision_source_url"),
+                )
+                .outerjoin(Article, Article.id == Chunk.article_id)
+                .outerjoin(Act, Act.id == Article.act_id)
+                .outerjoin(Decision, Decision.id == Chunk.decision_id)
+                .where(Chunk.id > last_id)
+                .order_by(Chunk.id)
+                .limit(batch_size)
+            )
+            rows = db.execute(q).all()
+            if not rows:
+                break
+
+            # One statement per batch, so the chunk triggers fire once
+            sources = values(
+                column("id", Integer),
+                column("citation", String),
+                column("source_url", String),
+                name="sources",
+            ).data([_sources(row) for row in rows])
+            db.execute(
+                update(Chunk)
+                .where(Chunk.id == sources.c.id)
+                .values(citation=sources.c.citation, source_url=sources.c.source_url)
+            )
+            db.commit()
+
+            updated += len(rows)
+            last_id = rows[-1].id
+            click.echo(f"  {updated}/{total} (id <= {last_id})")
+
+        click.secho(f"Backfilled {updated} chunks", fg="green")
+
+
+def _sources(row) -> tuple[int, str, str | None]:
+    if row.article_id is not None:
+        return (
+            row.id,
+            article_citation(row.number, row),
+            article_source_url(row.eid, row),
+        )
+    return (
+        row.id,
+        decision_citation(row.decision_number, row.decision_date),
+        row.decision_source_url,
+    )
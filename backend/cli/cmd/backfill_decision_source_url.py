@@ -1,7 +1,7 @@
 import click
-from sqlalchemy import func, select
+from sqlalchemy import func, select, update
 
-from app.db.models import Decision, DecisionFile
+from app.db.models import Chunk, Decision, DecisionFile
 from app.db.session import SessionLocal
 from cli.utils.http import fetch_json
 
@@ -51,6 +51,11 @@ def backfill_decision_source_url(spider: str | None, force: bool, batch_size: in
 
                 if source_url:
                     decision.source_url = source_url
+                    db.execute(
+                        update(Chunk)
+                        .where(Chunk.decision_id == decision.id)
+                        .values(source_url=source_url)
+                    )
                     updated += 1
                     click.echo(f"  {decision.citation}: updated")
                 else:
@@ -0,0 +1,37 @@
+import click
+from sqlalchemy import func, select
+
+from app.db.models import Chunk
+from app.db.session import SessionLocal
+from cli.utils.embedding import store_embeddings
+
+
+@click.command(name="backfill-embedding-store")
+@click.option("--batch-size", default=2000, show_default=True)
+def backfill_embedding_store(batch_size: int):
+    """Add the embeddings chunks already have to embedding_store.
+
+    Keys use BULK_EMBEDDING_MODEL, so run it only while existing vectors
+    come from that model. Run it again after the key changes (see
+    embedding_key). Each batch commits on its own.
+    """
+    with SessionLocal() as db:
+        last_id = 0
+        stored = 0
+        while True:
+            page = (
+                select(Chunk.id)
+                .where(Chunk.id > last_id)
+                .order_by(Chunk.id)
+                .limit(batch_size)
+                .subquery()
+            )
+            upto = db.scalar(select(func.max(page.c.id)))
+            if upto is None:
+                break
+            stored += store_embeddings(db, Chunk.id > last_id, Chunk.id <= upto)
+            db.commit()
+            last_id = upto
+            click.echo(f"  {stored} stored (id <= {last_id})")
+
+        click.secho(f"Stored {stored} embeddings", fg="green")
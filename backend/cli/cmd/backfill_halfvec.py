@@ -0,0 +1,61 @@
+import click
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+
+@click.command(name="backfill-halfvec")
+@click.option("--batch-size", default=2000, show_default=True)
+def backfill_halfvec(batch_size: int):
+    """Copy chunk.embedding into embedding_half in keyset batches.
+
+    Run between the expand (c4f1a2b7d9e3) and contract (a9f4c2e7b1d3)
+    migrations; each batch commits on its own so the table stays writable.
+    """
+    with SessionLocal() as db:
+        has_column = db.scalar(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'chunk' AND column_name = 'embedding_half')"
+            )
+        )
+        if not has_column:
+            click.secho("No embedding_half column, nothing to backfill", fg="green")
+            return
+
+        total = db.scalar(
+            text(
+                "SELECT count(*) FROM chunk "
+                "WHERE embedding IS NOT NULL AND embedding_half IS NULL"
+            )
+        )
+        click.echo(f"Found {total} chunks to backfill")
+
+        last_id = 0
+        updated = 0
+        while True:
+            upto = db.scalar(
+                text(
+                    "SELECT max(id) FROM "
+                    "(SELECT id FROM chunk WHERE id > :last_id ORDER BY id LIMIT :n) s"
+                ),
+                {"last_id": last_id, "n": batch_size},
+            )
+            if upto is None:
+                break
+
+            result = db.execute(
+                text(
+                    "UPDATE chunk SET embedding_half = embedding::halfvec(3584) "
+                    "WHERE id > :last_id AND id <= :upto "
+                    "AND embedding IS NOT NULL AND embedding_half IS NULL"
+                ),
+                {"last_id": last_id, "upto": upto},
+            )
+            db.commit()
+
+            updated += result.rowcount
+            last_id = upto
+            click.echo(f"  {updated}/{total} (id <= {upto})")
+
+        click.secho(f"Backfilled {updated} chunks", fg="green")
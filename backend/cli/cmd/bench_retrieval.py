@@ -0,0 +1,403 @@
+import asyncio
+import gzip
+import json
+import re
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, TypeVar, get_args
+
+import click
+from sqlalchemy import select, text
+
+from app.core.cache import normalize_key_text
+from app.core.clients import async_cohere_client, async_openai_client
+from app.core.config import settings
+from app.core.types import Language
+from app.db.models import Act, Article
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.repositories.chunk_repository import AsyncChunkRepository, ChunkHit
+from app.schemas.query import ExpandedQueries
+from app.services.chat_service import AsyncChatService
+from app.services.embedding_service import AsyncEmbeddingService
+from app.services.llm_service import AsyncLLMService
+from app.services.query_expansion_service import AsyncQueryExpansionService
+from app.services.reranker_service import AsyncRerankerService
+
+# ANN indexes behind each VECTOR_SEARCH mode (LIKE patterns)
+VECTOR_INDEXES = {
+    "hnsw": "ix_chunk_embedding_hnsw_%",
+    "binary": "ix_chunk_embedding_bq",
+    "reduced": "ix_chunk_embedding_reduced_hnsw_%",
+}
+
+T = TypeVar("T")
+
+# "Art. 271a Abs. 1 lit. c OR", "art. 41 al. 1 CO" in LEXam gold answers
+_CITATION = re.compile(
+    r"\b[Aa]rt\.\s*(\d+[a-z]*)"
+    r"(?:\s+(?:Abs|al|cpv|para|Ziff|ch|n|lit|let)\.?\s*[\w.]+)*"
+    r"\s+([A-Z][A-Za-z]*[A-Z])\b"
+)
+
+
+class Fixtures:
+    """Recorded embeddings, expansions and rerank scores, so runs can be
+    replayed offline."""
+
+    def __init__(self, path: Path, record: bool):
+        self.path = path
+        self.record = record
+        self.embeddings: dict[str, list[float]] = {}
+        self.expansions: dict[str, dict] = {}
+        self.reranks: dict[str, dict[str, float]] = {}
+        self.missing: set[str] = set()
+        if path.exists():
+            with _open(path, "rt") as f:
+                data = json.load(f)
+            self.embeddings = data["embeddings"]
+            self.expansions = data["expansions"]
+            self.reranks = data.get("reranks", {})
+
+    def save(self) -> None:
+        with _open(self.path, "wt") as f:
+            json.dump(
+                {
+                    "embeddings": self.embeddings,
+                    "expansions": self.expansions,
+                    "reranks": self.reranks,
+                },
+                f,
+            )
+
+    def lookup(self, table: dict, key: str, query: str):
+        if key not in table:
+            self.miss(query)
+        return table.get(key)
+
+    def miss(self, query: str) -> None:
+        """Fail the stage for a query without fixtures, unless recording.
+
+        A failed stage only degrades, so misses are also collected and
+        reported once the run is over.
+        """
+        if not self.record:
+            self.missing.add(query)
+            raise LookupError(f"No recorded fixture for {query!r}")
+
+    async def fetch(self, query: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Call the API to record a fixture. A failure is collected like a
+        miss, so an outage fails the recording instead of being saved."""
+        try:
+            return await call()
+        except Exception:
+            self.missing.add(query)
+            raise
+
+
+class ReplayEmbedding:
+    def __init__(self, fixtures: Fixtures, service: AsyncEmbeddingService):
+        self.fixtures = fixtures
+        self.service = service
+
+    async def embed_text(self, text: str) -> list[float]:
+        key = normalize_key_text(text)
+        embedding = self.fixtures.lookup(self.fixtures.embeddings, key, text)
+        if embedding is None:
+            embedding = await self.fixtures.fetch(
+                text, lambda: self.service.embed_text(text)
+            )
+            self.fixtures.embeddings[key] = embedding
+        return embedding
+
+
+class ReplayExpansion:
+    def __init__(self, fixtures: Fixtures, service: AsyncQueryExpansionService):
+        self.fixtures = fixtures
+        self.service = service
+
+    async def expand(self, query: str, lang: Language) -> ExpandedQueries:
+        key = f"{lang}:{normalize_key_text(query)}"
+        expanded = self.fixtures.lookup(self.fixtures.expansions, key, query)
+        if expanded is None:
+            result = await self.fixtures.fetch(
+                query, lambda: self.service.expand(query, lang)
+            )
+            self.fixtures.expansions[key] = result.model_dump()
+            return result
+        return ExpandedQueries.model_validate(expanded)
+
+
+class ReplayReranker:
+    """Replays recorded Cohere relevance scores per (query, chunk id).
+
+    Scores are per query-document pair, so a changed candidate set only
+    needs the new chunks scored when recording.
+    """
+
+    def __init__(self, fixtures: Fixtures, client):
+        self.fixtures = fixtures
+        self.client = client
+
+    async def rerank(
+        self, query: str, chunks: list[ChunkHit], top_n: int
+    ) -> list[ChunkHit]:
+        key = normalize_key_text(query)
+        scores = self.fixtures.reranks.get(key, {})
+        unscored = [c for c in chunks if str(c.id) not in scores]
+        if unscored:
+            self.fixtures.miss(query)
+            response = await self.fixtures.fetch(
+                query,
+                lambda: self.client.rerank(
+                    query=query,
+                    documents=[c.text for c in unscored],
+                    model=settings.cohere_rerank_model,
+                    top_n=len(unscored),
+                ),
+            )
+            scores = self.fixtures.reranks.setdefault(key, {})
+            for r in response.results:
+                scores[str(unscored[r.index].id)] = r.relevance_score
+        return sorted(chunks, key=lambda c: scores[str(c.id)], reverse=True)[:top_n]
+
+
+class KeepOrder:
+    """Stands in for the reranker to benchmark RRF order alone."""
+
+    async def rerank(
+        self, query: str, chunks: list[ChunkHit], top_n: int
+    ) -> list[ChunkHit]:
+        return chunks[:top_n]
+
+
+@click.command(name="bench-retrieval")
+@click.argument("queries")
+@click.option("--concurrency", "-c", default=4, show_default=True)
+@click.option("--limit", "-n", type=int, default=None, help="Limit number of queries")
+@click.option(
+    "-k",
+    "ks",
+    multiple=True,
+    type=int,
+    default=(1, 5, 10),
+    show_default=True,
+    help="Cutoffs for recall@k (repeatable)",
+)
+@click.option(
+    "--fixtures",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Replay embeddings, expansions and rerank scores from this JSON(.gz) file",
+)
+@click.option(
+    "--record", is_flag=True, help="Call the APIs for missing fixtures and save them"
+)
+@click.option("--rerank/--no-rerank", default=True, show_default=True)
+@click.option(
+    "--vector-search",
+    type=click.Choice(list(VECTOR_INDEXES)),
+    default=None,
+    help="Override VECTOR_SEARCH for this run",
+)
+def bench_retrieval(
+    queries: str,
+    concurrency: int,
+    limit: int | None,
+    ks: tuple[int, ...],
+    fixtures: Path | None,
+    record: bool,
+    rerank: bool,
+    vector_search: str | None,
+):
+    """Run QUERIES (JSONL) through expansion, embedding, search and rerank.
+
+    Each line needs "query" and may set "lang" (default de) and labelled
+    "article_ids"/"decision_ids" for recall@k. Files written by
+    export-retrieval-log can be used directly. Pass "lexam" instead to run
+    the Swiss LEXam open questions, labelled with the articles cited in
+    their gold answers. Compare recall across --vector-search modes against
+    the index sizes reported at the end.
+    """
+    if queries == "lexam":
+        rows = _load_lexam(limit)
+    elif Path(queries).is_file():
+        rows = _load_queries(Path(queries))[:limit]
+    else:
+        raise click.BadParameter(f"{queries!r} is not a file or 'lexam'")
+    if not rows:
+        raise click.ClickException("No queries to run")
+    if record and fixtures is None:
+        raise click.BadParameter("--record requires --fixtures")
+
+    if vector_search:
+        settings.vector_search = vector_search
+
+    replay = Fixtures(fixtures, record) if fixtures else None
+    svc = _build_service(replay, rerank)
+
+    results, elapsed, index_sizes = asyncio.run(_run(svc, rows, concurrency))
+
+    if replay and replay.missing:
+        if record:
+            raise click.ClickException(
+                f"Recording failed for {len(replay.missing)} queries, no fixtures saved"
+            )
+        raise click.ClickException(
+            f"No recorded fixtures for {len(replay.missing)} queries, "
+            "run with --record first"
+        )
+    if replay and record:
+        replay.save()
+        click.echo(f"Saved fixtures to {fixtures}")
+
+    _report(rows, results, elapsed, sorted(ks))
+    _report_index_sizes(index_sizes)
+
+
+def _build_service(replay: Fixtures | None, rerank: bool) -> AsyncChatService:
+    embedding = AsyncEmbeddingService(async_openai_client)
+    expansion = AsyncQueryExpansionService(async_openai_client)
+    if not rerank:
+        reranker = KeepOrder()
+    elif replay:
+        reranker = ReplayReranker(replay, async_cohere_client)
+    else:
+        reranker = AsyncRerankerService(async_cohere_client)
+    return AsyncChatService(
+        chunk_repo=AsyncChunkRepository(AsyncSessionLocal),
+        embedding_service=ReplayEmbedding(replay, embedding) if replay else embedding,
+        llm_service=AsyncLLMService(async_openai_client),
+        query_expansion_service=(
+            ReplayExpansion(replay, expansion) if replay else expansion
+        ),
+        reranker=reranker,
+    )
+
+
+async def _run(svc: AsyncChatService, rows: list[dict], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(row: dict):
+        async with semaphore:
+            return await svc.retrieve(row["query"], row.get("lang", "de"))
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*[run_one(row) for row in rows])
+    elapsed = time.perf_counter() - t0
+    return results, elapsed, await _index_sizes()
+
+
+async def _index_sizes() -> dict[str, int]:
+    async with AsyncSessionLocal() as db:
+        return {
+            mode: await db.scalar(
+                text(
+                    "SELECT coalesce(sum(pg_relation_size(indexrelid)), 0) "
+                    "FROM pg_stat_user_indexes "
+                    "WHERE relname = 'chunk' AND indexrelname LIKE :pattern"
+                ),
+                {"pattern": pattern},
+            )
+            for mode, pattern in VECTOR_INDEXES.items()
+        }
+
+
+def _report(rows: list[dict], results: list, elapsed: float, ks: list[int]) -> None:
+    timings: dict[str, list[float]] = {}
+    recalls: dict[str, list[float]] = {}
+    degraded = 0
+
+    for row, (articles, decisions, trace) in zip(rows, results):
+        for stage, seconds in trace.timings.items():
+            timings.setdefault(stage, []).append(seconds)
+        degraded += bool(trace.degraded)
+
+        for source_type, chunks, labels in (
+            ("article", articles, row.get("article_ids")),
+            ("decision", decisions, row.get("decision_ids")),
+        ):
+            if not labels:
+                continue
+            ids = [getattr(c, f"{source_type}_id") for c in chunks]
+            candidates = trace.candidates.get(source_type, [])
+            for k in ks:
+                recalls.setdefault(f"{source_type} recall@{k}", []).append(
+                    _recall(ids[:k], labels)
+                )
+            recalls.setdefault(f"{source_type} candidate recall", []).append(
+                _recall([c["source_id"] for c in candidates], labels)
+            )
+
+    click.echo(
+        f"{len(rows)} queries in {elapsed:.2f}s "
+        f"({len(rows) / elapsed:.2f} QPS, {degraded} degraded)"
+    )
+
+    click.echo(f"\n{'stage':<24}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for stage, values in timings.items():
+        p50, p95, p99 = (_percentile(values, p) * 1000 for p in (50, 95, 99))
+        click.echo(f"{stage:<24}{p50:>7.0f}ms{p95:>7.0f}ms{p99:>7.0f}ms")
+
+    if recalls:
+        click.echo("")
+        for name, values in recalls.items():
+            click.echo(f"{name:<28}{sum(values) / len(values):.3f}  (n={len(values)})")
+
+
+def _report_index_sizes(sizes: dict[str, int]) -> None:
+    click.echo(f"\n{'vector index':<24}{'size':>9}")
+    for mode, size in sizes.items():
+        active = "  (this run)" if mode == settings.vector_search else ""
+        click.echo(f"{mode:<24}{size / 2**20:>7.0f}MB{active}")
+
+
+def _recall(found: list, labels: list) -> float:
+    return len(set(found) & set(labels)) / len(set(labels))
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+def _load_queries(path: Path) -> list[dict]:
+    with _open(path, "rt") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _load_lexam(limit: int | None) -> list[dict]:
+    from datasets import load_dataset
+
+    data = load_dataset("LEXam-Benchmark/LEXam", "open_question")
+    questions = [r for r in data["test"] if r["jurisdiction"] == "Swiss"]  # type: ignore
+    rows = []
+    with SessionLocal() as db:
+        for r in questions[:limit]:
+            lang = r["language"] if r["language"] in get_args(Language) else "de"
+            cited = {(number, abbr) for number, abbr in _CITATION.findall(r["answer"])}
+            article_ids = [
+                article_id
+                for number, abbr in sorted(cited)
+                if (article_id := _resolve_article(db, number, abbr, lang))
+            ]
+            rows.append(
+                {"query": r["question"], "lang": lang, "article_ids": article_ids}
+            )
+    return rows
+
+
+def _resolve_article(db, number: str, abbr: str, lang: str) -> int | None:
+    """Id of the article in the latest version of the act with this abbr."""
+    return db.scalar(
+        select(Article.id)
+        .join(Act)
+        .where(Act.abbr == abbr, Act.lang == lang, Article.number == f"Art. {number}")
+        .order_by(Act.applicability_date.desc())
+        .limit(1)
+    )
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
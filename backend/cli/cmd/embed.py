@@ -1,10 +1,14 @@
 import click
 
 from app.db.session import SessionLocal
-from cli.utils.embedding import embed_missing_chunks
+from cli.utils.embedding import embed_missing_chunks, reduce_missing_chunks
 
 
 @click.command(name="embed")
-def embed_command():
+@click.option(
+    "--failed", is_flag=True, help="Only retry chunks recorded in embedding_failure"
+)
+def embed_command(failed: bool):
     with SessionLocal() as db:
-        embed_missing_chunks(db)
+        embed_missing_chunks(db, failed_only=failed)
+        reduce_missing_chunks(db)
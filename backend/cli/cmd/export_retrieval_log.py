@@ -0,0 +1,47 @@
+import gzip
+import json
+
+import click
+from sqlalchemy import func, select
+
+from app.db.models import RetrievalLog
+from app.db.session import SessionLocal
+
+
+@click.command(name="export-retrieval-log")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--since", type=click.DateTime(), default=None)
+@click.option("--until", type=click.DateTime(), default=None)
+@click.option("--batch-size", default=1000, show_default=True)
+def export_retrieval_log(output: str, since, until, batch_size: int):
+    """Export retrieval log entries as JSONL (gzipped if OUTPUT ends in .gz)."""
+    with SessionLocal() as db:
+        q = select(RetrievalLog).order_by(RetrievalLog.id)
+        count_q = select(func.count(RetrievalLog.id))
+        if since:
+            q = q.where(RetrievalLog.created_at >= since)
+            count_q = count_q.where(RetrievalLog.created_at >= since)
+        if until:
+            q = q.where(RetrievalLog.created_at < until)
+            count_q = count_q.where(RetrievalLog.created_at < until)
+
+        total = db.scalar(count_q)
+        click.echo(f"Exporting {total} entries")
+
+        opener = gzip.open if output.endswith(".gz") else open
+        with opener(output, "wt", encoding="utf-8") as f:
+            for entry in db.scalars(q).yield_per(batch_size):
+                record = {
+                    "id": entry.id,
+                    "created_at": entry.created_at.isoformat(),
+                    "query": entry.query,
+                    "lang": entry.lang,
+                    "expanded": entry.expanded,
+                    "candidates": entry.candidates,
+                    "reranked": entry.reranked,
+                    "timings": entry.timings,
+                    "degraded": entry.degraded,
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        click.secho(f"Wrote {total} entries to {output}", fg="green")
@@ -177,6 +177,9 @@ def _process_decision(
         chunk = Chunk(
             source_type="decision",
             decision_id=decision.id,
+            lang=lang,
+            citation=decision.citation,
+            source_url=decision.source_url,
             text=chunk_body,
             embedding_input=chunk_body,
         )
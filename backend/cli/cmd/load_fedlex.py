@@ -1,11 +1,13 @@
 import click
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
 
 from app.db.models import Act, ActConfig, Article, Chunk
+from app.db.models.legal import article_citation, article_source_url
 from app.db.session import SessionLocal
 from cli.utils import sparql
 from cli.utils.context import generate_context_anthropic as generate_context
+from cli.utils.embedding import store_embeddings
 from cli.utils.html import soup_to_text
 from cli.utils.http import fetch_html
 from cli.utils.text import split_text
@@ -16,9 +18,30 @@ from cli.utils.text import split_text
 @click.option("--sr-number")
 @click.option("--force", is_flag=True, default=False)
 @click.option("--enable-context", is_flag=True, default=False)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Update the previous consolidation in place, re-chunking changed articles",
+)
 def load_fedlex_command(
-    lang: str, sr_number: str | None, force: bool, enable_context: bool
+    lang: str,
+    sr_number: str | None,
+    force: bool,
+    enable_context: bool,
+    incremental: bool,
 ):
+    """Load the current consolidation of each act.
+
+    A new consolidation, or --force, replaces the act and all its chunks.
+    With --incremental the previous consolidation is updated instead:
+    articles are matched by eid, chunks whose text is unchanged are kept
+    with their embeddings, new ones are added and those of changed or
+    removed articles are deactivated. Chunks and articles still gone at
+    the next sync are deleted; their embeddings stay in embedding_store.
+    """
+    if enable_context and incremental:
+        raise click.UsageError("--enable-context regenerates every chunk")
     if enable_context:
         force = True
     with SessionLocal() as db:
@@ -28,10 +51,10 @@ def load_fedlex_command(
         q = select(Act).where(Act.lang == lang)
         if sr_number:
             q = q.where(Act.sr_number == sr_number)
-        existing = {
-            (act.sr_number, str(act.applicability_date)): act
-            for act in db.scalars(q).all()
-        }
+        acts = db.scalars(q.order_by(Act.applicability_date)).all()
+        existing = {(act.sr_number, str(act.applicability_date)): act for act in acts}
+        # Latest consolidation per act, for --incremental
+        latest = {act.sr_number: act for act in acts}
 
         for row in rows:
             label = row.abbr or row.title or row.sr_number
@@ -50,25 +73,38 @@ def load_fedlex_command(
                     db.merge(config)
                     db.flush()
 
-                if act:
-                    db.delete(act)
+                values = {
+                    "lang": lang,
+                    "sr_number": row.sr_number,
+                    "title": row.title,
+                    "abbr": row.abbr,
+                    "source_url": row.source_url,
+                    "html_url": row.html_url,
+                    "xml_url": row.xml_url,
+                    "applicability_date": row.applicability_date,
+                    "applicability_end_date": row.applicability_end_date,
+                }
+
+                previous = act or latest.get(row.sr_number)
+                if incremental and previous:
+                    click.echo(f"  {label}: from {previous.applicability_date}")
+                    for key, value in values.items():
+                        setattr(previous, key, value)
                     db.flush()
+                    _sync_act(db, previous)
+                    act = previous
+                else:
+                    if act:
+                        # Let the database cascade instead of loading every
+                        # article and chunk to delete it
+                        db.execute(delete(Act).where(Act.id == act.id))
+                        db.expunge(act)
 
-                act = Act(
-                    lang=lang,
-                    sr_number=row.sr_number,
-                    title=row.title,
-                    abbr=row.abbr,
-                    source_url=row.source_url,
-                    html_url=row.html_url,
-                    xml_url=row.xml_url,
-                    applicability_date=row.applicability_date,
-                    applicability_end_date=row.applicability_end_date,
-                )
-                db.add(act)
-                db.flush()
-                click.echo(f"  {label}:")
-                _process_act(db, act)
+                    act = Act(**values)
+                    db.add(act)
+                    db.flush()
+                    click.echo(f"  {label}:")
+                    _process_act(db, act)
                 db.commit()
                 click.secho(f"  {label}: done", fg="green")
             except Exception as e:
@@ -79,6 +115,159 @@ def load_fedlex_command(
 
 
 def _process_act(db: Session, act: Act):
+    act_soup, act_text = _fetch_act(db, act)
+    articles = _parse_articles(act_soup)
+
+    ids = _insert_articles(db, act, [article for article, _ in articles])
+    chunks = []
+    for article_id, (article, breadcrumb) in zip(ids, articles):
+        header = f"{act.label} | {breadcrumb}"
+        for chunk_text, body in _split(act, article):
+            chunks.append(
+                _chunk(act, article_id, article, body, header, chunk_text, act_text)
+            )
+    if chunks:
+        db.execute(insert(Chunk), chunks)
+
+    click.echo(f"    {len(articles)} articles, {len(chunks)} chunks")
+
+
+def _sync_act(db: Session, act: Act):
+    """Diff the fetched articles against the act's stored ones by eid."""
+    act_soup, act_text = _fetch_act(db, act)
+    articles = _parse_articles(act_soup)
+
+    stored = {
+        row.eid: row
+        for row in db.execute(
+            select(
+                Article.id,
+                Article.eid,
+                Article.number,
+                Article.html,
+                Article.text,
+                Article.sort_order,
+                Article.active,
+            ).where(Article.act_id == act.id)
+        )
+    }
+    stored_chunks: dict[int, list] = {}
+    for row in db.execute(
+        select(
+            Chunk.id,
+            Chunk.article_id,
+            Chunk.active,
+            Chunk.text,
+            Chunk.citation,
+            Chunk.embedding_input,
+            Chunk.source_url,
+        )
+        .join(Article, Article.id == Chunk.article_id)
+        .where(Article.act_id == act.id)
+    ):
+        stored_chunks.setdefault(row.article_id, []).append(row)
+
+    added = [article for article, _ in articles if article["eid"] not in stored]
+    ids = dict(
+        zip([article["eid"] for article in added], _insert_articles(db, act, added))
+    )
+    # Only differing columns, so articles that merely moved get a
+    # sort_order update
+    updates = []
+    for article, _ in articles:
+        old = stored.get(article["eid"])
+        if not old:
+            continue
+        diff = {k: v for k, v in article.items() if getattr(old, k) != v}
+        if not old.active:
+            diff["active"] = True
+        if diff:
+            updates.append({"id": old.id, **diff})
+    if updates:
+        db.execute(update(Article), updates)
+    changed = sum(1 for u in updates if u.keys() - {"id", "sort_order", "active"})
+    restored = sum(1 for u in updates if "active" in u)
+
+    new_chunks, reactivated, refreshed, stale, purged = [], [], [], [], []
+    for article, breadcrumb in articles:
+        header = f"{act.label} | {breadcrumb}"
+        article_id = ids.get(article["eid"]) or stored[article["eid"]].id
+        old = stored_chunks.pop(article_id, [])
+        sources = {
+            "citation": article_citation(article["number"], act),
+            "source_url": article_source_url(article["eid"], act),
+        }
+        for chunk_text, body in _split(act, article):
+            # Matched without the citation, which changes with every
+            # consolidation of acts that have no abbreviation. The header
+            # check keeps a generated context along with the embedding.
+            match = next(
+                (
+                    c
+                    for c in old
+                    if c.text.partition("\n\n")[2] == chunk_text
+                    and (c.embedding_input or "").startswith(f"{header}\n\n")
+                ),
+                None,
+            )
+            if match is None:
+                new_chunks.append(
+                    _chunk(act, article_id, article, body, header, chunk_text, act_text)
+                )
+                continue
+            old.remove(match)
+            if not match.active:
+                reactivated.append(match.id)
+            # embedding_input keeps the text the embedding was made from
+            diff = {
+                k: v
+                for k, v in {"text": body, **sources}.items()
+                if getattr(match, k) != v
+            }
+            if diff:
+                refreshed.append({"id": match.id, **diff})
+        stale += [c.id for c in old if c.active]
+        purged += [c.id for c in old if not c.active]
+
+    # Articles no longer in the act are deactivated first and deleted if
+    # still gone at the next sync
+    fetched = {article["eid"] for article, _ in articles}
+    removed, deleted = [], []
+    for eid, old in stored.items():
+        if eid in fetched:
+            continue
+        if old.active:
+            removed.append(old.id)
+            stale += [c.id for c in stored_chunks.get(old.id, []) if c.active]
+        else:
+            deleted.append(old.id)
+
+    if removed:
+        db.execute(update(Article).where(Article.id.in_(removed)).values(active=False))
+    if reactivated:
+        db.execute(update(Chunk).where(Chunk.id.in_(reactivated)).values(active=True))
+    if stale:
+        db.execute(update(Chunk).where(Chunk.id.in_(stale)).values(active=False))
+    if refreshed:
+        db.execute(update(Chunk), refreshed)
+    if purged:
+        store_embeddings(db, Chunk.id.in_(purged))
+        db.execute(delete(Chunk).where(Chunk.id.in_(purged)))
+    if deleted:
+        store_embeddings(db, Chunk.article_id.in_(deleted))
+        db.execute(delete(Article).where(Article.id.in_(deleted)))
+    if new_chunks:
+        db.execute(insert(Chunk), new_chunks)
+
+    click.echo(
+        f"    {len(articles)} articles ({len(added)} new, {changed} changed, "
+        f"{restored} restored, {len(removed)} removed, {len(deleted)} deleted), "
+        f"{len(new_chunks)} chunks added, {len(reactivated)} reactivated, "
+        f"{len(stale)} deactivated, {len(purged)} deleted"
+    )
+
+
+def _fetch_act(db: Session, act: Act):
     click.echo("    Fetching HTML...")
 
     act_config = db.get(ActConfig, act.sr_number) or ActConfig(
@@ -88,10 +277,12 @@ def _process_act(db: Session, act: Act):
 
     act_soup = fetch_html(act.html_url)
     act_text = soup_to_text(act_soup) if act_config.generate_context else None
+    return act_soup, act_text
 
-    articles = []
-    chunks = []
 
+def _parse_articles(act_soup) -> list[tuple[dict, str]]:
+    """Article columns and section breadcrumb, in document order."""
+    articles = []
     for sort_order, article_tag in enumerate(act_soup.find_all("article")):
         eid = article_tag.get("id")
         assert eid, f"article at position {sort_order} has no id"
@@ -104,42 +295,56 @@ def _process_act(db: Session, act: Act):
         assert collapseable, f"no .collapseable in article {eid}"
         text = soup_to_text(collapseable)
 
-        article = Article(
-            act_id=act.id,
-            eid=eid,
-            number=number,
-            html=str(article_tag),
-            text=text,
-            sort_order=sort_order,
-        )
-        db.add(article)
-        articles.append(article)
-        db.flush()
-
-        breadcrumb = " > ".join(_section_headers(article_tag))
-        context_header = f"{act.label} | {breadcrumb}"
+        article = {
+            "eid": eid,
+            "number": number,
+            "html": str(article_tag),
+            "text": text,
+            "sort_order": sort_order,
+        }
+        articles.append((article, " > ".join(_section_headers(article_tag))))
+    return articles
 
-        for chunk_text in split_text(article.text):
-            context_parts = [context_header]
 
-            if act_config.generate_context:
-                context_parts.append(generate_context(act_text, chunk_text, act.lang))
+def _insert_articles(db: Session, act: Act, articles: list[dict]) -> list[int]:
+    if not articles:
+        return []
+    return db.scalars(
+        insert(Article).returning(Article.id, sort_by_parameter_order=True),
+        [{"act_id": act.id, **article} for article in articles],
+    ).all()
 
-            chunk_body = f"{article.citation}\n\n{chunk_text}"
-            embedding_input = "\n\n".join(context_parts) + f"\n\n{chunk_body}"
 
-            chunk = Chunk(
-                source_type="article",
-                article_id=article.id,
-                text=chunk_body,
-                embedding_input=embedding_input,
-            )
-            chunks.append(chunk)
+def _split(act: Act, article: dict) -> list[tuple[str, str]]:
+    """(chunk text, chunk body with citation) per chunk of an article."""
+    citation = article_citation(article["number"], act)
+    return [
+        (chunk_text, f"{citation}\n\n{chunk_text}")
+        for chunk_text in split_text(article["text"])
+    ]
 
-    db.add_all(chunks)
-    db.flush()
 
-    click.echo(f"    {len(articles)} articles, {len(chunks)} chunks")
+def _chunk(
+    act: Act,
+    article_id: int,
+    article: dict,
+    body: str,
+    header: str,
+    chunk_text: str,
+    act_text: str | None,
+) -> dict:
+    context_parts = [header]
+    if act_text is not None:
+        context_parts.append(generate_context(act_text, chunk_text, act.lang))
+    return {
+        "source_type": "article",
+        "article_id": article_id,
+        "lang": act.lang,
+        "citation": article_citation(article["number"], act),
+        "source_url": article_source_url(article["eid"], act),
+        "text": body,
+        "embedding_input": "\n\n".join(context_parts) + f"\n\n{body}",
+    }
 
 
 def _section_headers(tag):
@@ -0,0 +1,85 @@
+import click
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+# Terms per active chunk, as in chunk_bm25_apply()
+DOC_TERMS = """
+    SELECT c.id, c.source_type, t.lexeme AS term,
+           coalesce(array_length(t.positions, 1), 1) AS tf
+    FROM chunk c, unnest(c.search_vector) t
+    WHERE c.active
+"""
+
+
+@click.command(name="rebuild-bm25")
+@click.option("--batch-size", default=2000, show_default=True)
+def rebuild_bm25(batch_size: int):
+    """Rebuild the BM25 postings and statistics from chunk.search_vector.
+
+    Backfills chunks that existed before the chunk_bm25 triggers, and
+    refreshes impacts once the average chunk length has drifted. Stats are
+    computed first so every batch is weighted with the final average.
+
+    Runs in a single transaction, so searches keep reading the old postings
+    until the rebuild commits. DELETE rather than TRUNCATE for the same
+    reason: TRUNCATE would block readers until the end. Do not run loaders at
+    the same time.
+    """
+    with SessionLocal() as db:
+        for table in ("chunk_term", "term_stat", "corpus_stat"):
+            db.execute(text(f"DELETE FROM {table}"))
+        db.execute(
+            text(
+                "INSERT INTO corpus_stat (source_type, doc_count, total_length) "
+                "SELECT source_type, count(DISTINCT id), sum(tf) "
+                f"FROM ({DOC_TERMS}) d GROUP BY source_type"
+            )
+        )
+        total = db.scalar(text("SELECT coalesce(sum(doc_count), 0) FROM corpus_stat"))
+        click.echo(f"Indexing {total} chunks")
+
+        last_id = 0
+        indexed = 0
+        while True:
+            upto = db.scalar(
+                text(
+                    "SELECT max(id) FROM (SELECT id FROM chunk WHERE id > :last_id "
+                    "AND active ORDER BY id LIMIT :n) s"
+                ),
+                {"last_id": last_id, "n": batch_size},
+            )
+            if upto is None:
+                break
+
+            result = db.execute(
+                text(
+                    f"""
+                    WITH docs AS ({DOC_TERMS} AND c.id > :last_id AND c.id <= :upto),
+                    lengths AS (
+                        SELECT id, source_type, sum(tf) AS len FROM docs GROUP BY 1, 2
+                    )
+                    INSERT INTO chunk_term (term, source_type, chunk_id, tf, impact)
+                    SELECT d.term, d.source_type, d.id, d.tf, bm25_impact(
+                        d.tf, l.len, s.total_length::float8 / s.doc_count
+                    )
+                    FROM docs d
+                    JOIN lengths l USING (id, source_type)
+                    JOIN corpus_stat s USING (source_type)
+                    """
+                ),
+                {"last_id": last_id, "upto": upto},
+            )
+
+            indexed += result.rowcount
+            last_id = upto
+            click.echo(f"  {indexed} postings (id <= {upto})")
+
+        db.execute(
+            text(
+                "INSERT INTO term_stat (term, source_type, df) "
+                "SELECT term, source_type, count(*) FROM chunk_term GROUP BY 1, 2"
+            )
+        )
+        db.commit()
+        click.secho(f"Indexed {total} chunks, {indexed} postings", fg="green")
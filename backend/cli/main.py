@@ -1,12 +1,18 @@
 import click
 
 from cli.cmd.backfill_act_source_url import backfill_source_url
+from cli.cmd.backfill_chunk_sources import backfill_chunk_sources
 from cli.cmd.backfill_decision_source_url import backfill_decision_source_url
+from cli.cmd.backfill_embedding_store import backfill_embedding_store
+from cli.cmd.backfill_halfvec import backfill_halfvec
+from cli.cmd.bench_retrieval import bench_retrieval
 from cli.cmd.embed import embed_command
 from cli.cmd.eval import eval_command
+from cli.cmd.export_retrieval_log import export_retrieval_log
 from cli.cmd.fedlex_config import act_status, configure_act
 from cli.cmd.load_entscheidsuche import load_entscheidsuche_command
 from cli.cmd.load_fedlex import load_fedlex_command
+from cli.cmd.rebuild_bm25 import rebuild_bm25
 from cli.cmd.shell import shell
 
 
@@ -16,11 +22,17 @@ def main():
 
 
 main.add_command(act_status)
+main.add_command(backfill_chunk_sources)
 main.add_command(backfill_decision_source_url)
+main.add_command(backfill_embedding_store)
+main.add_command(backfill_halfvec)
 main.add_command(backfill_source_url)
+main.add_command(bench_retrieval)
 main.add_command(configure_act)
 main.add_command(eval_command)
+main.add_command(export_retrieval_log)
 main.add_command(load_fedlex_command)
+main.add_command(rebuild_bm25)
 main.add_command(shell)
 main.add_command(embed_command)
 main.add_command(load_entscheidsuche_command)
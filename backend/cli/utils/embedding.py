@@ -1,24 +1,55 @@
+import re
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
 
 import click
 import openai
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session, defer
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_exponential,
-)
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, sessionmaker
+from tenacity import retry, retry_if_exception_type, stop_after_attempt
 
 from app.core.clients import bulk_embedding_client as client
 from app.core.config import settings
-from app.db.models import Chunk
+from app.db.models import Chunk, EmbeddingFailure, EmbeddingStore
+from app.db.models.chunks import REDUCED_EMBEDDING_DIMS
+from app.db.models.embedding_store import embedding_key
+from cli.utils.rate_limit import AdaptiveLimiter
 
 embedding_model = settings.bulk_embedding_model
 batch_size = settings.bulk_embedding_batch_size
 max_workers = settings.bulk_embedding_max_workers
+max_tokens = settings.bulk_embedding_max_tokens
+requests_per_minute = settings.bulk_embedding_requests_per_minute
+
+# Retried through the limiter; anything else fails the batch at once
+_RETRYABLE = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+)
+
+# Wrong key, model or URL: every later batch would fail the same way
+_FATAL_STATUS = (401, 403, 404)
+
+_update_embedding = text(
+    "UPDATE chunk SET embedding = CAST(:embedding AS halfvec), "
+    "embedding_reduced = l2_normalize(subvector("
+    f"CAST(:embedding AS halfvec), 1, {REDUCED_EMBEDDING_DIMS})) "
+    "WHERE id = :id"
+)
+
+# Rejections a smaller request avoids: OpenAI and vLLM context length errors,
+# and TEI's input token and batch size validation (422 there)
+_TOO_LARGE = re.compile(
+    r"maximum context length|context_length_exceeded"
+    r"|must have less than \d+ tokens|maximum allowed batch size",
+    re.IGNORECASE,
+)
 
 
 def _fmt_eta(seconds: float) -> str:
@@ -31,83 +62,388 @@ def _fmt_eta(seconds: float) -> str:
     return f"{s}s"
 
 
-def embed_missing_chunks(db: Session):
-    page_size = 1000
-    total = 0
-    t0 = time.monotonic()
+def estimate_tokens(text: str) -> int:
+    """Token count from length, for endpoints without a local tokenizer."""
+    return int(len(text) / settings.bulk_embedding_chars_per_token) + 1
+
+
+class TokenBudget:
+    """Tokens per API batch, shared by the reader and the workers.
+
+    Drops to half of any batch the endpoint rejects as too large and
+    grows back by a tenth after each success, staying below the smallest
+    rejected batch.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.tokens = limit
+        self._lock = threading.Lock()
+
+    def shrink(self, rejected: int) -> None:
+        with self._lock:
+            self.limit = max(1, min(self.limit, rejected - 1))
+            self.tokens = max(1, min(self.tokens, rejected // 2))
+
+    def grow(self) -> None:
+        with self._lock:
+            self.tokens = min(self.limit, int(self.tokens * 1.1) + 1)
+
+
+def embed_missing_chunks(
+    db: Session,
+    page_size: int = 2000,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+    failed_only: bool = False,
+):
+    """Embed active chunks that have no embedding yet, or only those in
+    embedding_failure with failed_only.
 
+    Chunks whose input is in embedding_store take the stored vector. The
+    rest are read in pages by id (only id and embedding_input), identical
+    inputs merged, sorted by length and packed into API batches of at
+    most max_tokens (see TokenBudget) and batch_size texts. Up to
+    2 x max_workers batches are in flight, so workers never wait for a
+    page to finish; an AdaptiveLimiter decides how many calls run at once.
+    A writer thread stores the vectors on its own session, page_size rows
+    per executemany UPDATE and transaction, derives embedding_reduced in
+    SQL and adds new inputs to embedding_store. Batches that still fail
+    after retries are recorded in embedding_failure.
+    """
+    missing = _missing(failed_only)
+    reused = _reuse_stored(db, missing, page_size)
+    if reused:
+        click.echo(f"    {reused} chunks reused stored embeddings")
+    total = db.scalar(select(func.count()).select_from(Chunk).where(*missing))
+    if not total:
+        click.echo("  No chunks to embed")
+        return
+    click.echo(f"    {total} chunks to embed")
+
+    budget = TokenBudget(max_tokens)
+    limiter = AdaptiveLimiter(max_workers, requests_per_minute)
+    slots = threading.Semaphore(2 * max_workers)
+    finished: Queue = Queue()
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        written = writer.submit(
+            _write_embeddings,
+            sessionmaker(db.get_bind()),
+            finished,
+            slots,
+            limiter,
+            total,
+            page_size,
+        )
+        batches = _missing_batches(db, missing, page_size, count_tokens, budget)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for batch in batches:
+                slots.acquire()
+                if written.done():
+                    break
+                future = pool.submit(_embed, batch, count_tokens, budget, limiter)
+                future.add_done_callback(
+                    lambda f, batch=batch: finished.put((batch, f))
+                )
+        finished.put(None)
+        done, failed = written.result()
+
+    click.echo(f"    done — {done} chunks embedded")
+    if failed:
+        click.secho(
+            f"    {failed} chunks failed, see embedding_failure; "
+            "retry them with `embed --failed`",
+            fg="red",
+        )
+
+
+def _missing(failed_only: bool) -> list:
+    conditions = [Chunk.active.is_(True), Chunk.embedding.is_(None)]
+    if failed_only:
+        conditions.append(Chunk.id.in_(select(EmbeddingFailure.chunk_id)))
+    return conditions
+
+
+def _reuse_stored(db: Session, missing: list, page_size: int) -> int:
+    key = embedding_key(Chunk.embedding_input, Chunk.citation, embedding_model)
+    reused = 0
+    last_id = 0
     while True:
-        remaining = db.scalar(
-            select(func.count())
-            .select_from(Chunk)
-            .where(Chunk.active.is_(True))
-            .where(Chunk.embedding.is_(None))
+        page = (
+            select(Chunk.id)
+            .where(*missing)
+            .where(Chunk.id > last_id)
+            .order_by(Chunk.id)
+            .limit(page_size)
+            .subquery()
         )
-        if not remaining:
-            if total == 0:
-                click.echo("  No chunks to embed")
-            else:
-                click.echo(f"    done — {total} chunks embedded")
-            return
+        upto = db.scalar(select(func.max(page.c.id)))
+        if upto is None:
+            return reused
+        result = db.execute(
+            update(Chunk)
+            .where(*missing, Chunk.id > last_id, Chunk.id <= upto)
+            .where(EmbeddingStore.key == key)
+            .values(
+                embedding=EmbeddingStore.embedding,
+                embedding_reduced=func.l2_normalize(
+                    func.subvector(EmbeddingStore.embedding, 1, REDUCED_EMBEDDING_DIMS)
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        reused += result.rowcount
+        last_id = upto
 
-        eta = ""
-        if total > 0:
-            rate = total / (time.monotonic() - t0)
-            eta = f" (ETA {_fmt_eta(remaining / rate)})"
-        click.echo(
-            f"    {remaining} remaining, embedding next {min(remaining, page_size)}...{eta}"
+
+def store_embeddings(db: Session, *criteria) -> int:
+    """Add the embeddings of chunks matching criteria to embedding_store."""
+    result = db.execute(
+        insert(EmbeddingStore)
+        .from_select(
+            ["key", "embedding"],
+            select(
+                embedding_key(Chunk.embedding_input, Chunk.citation, embedding_model),
+                Chunk.embedding,
+            ).where(
+                Chunk.embedding.is_not(None),
+                Chunk.embedding_input.is_not(None),
+                *criteria,
+            ),
         )
-        chunks = db.scalars(
-            select(Chunk)
-            .where(Chunk.active.is_(True))
-            .where(Chunk.embedding.is_(None))
-            .options(defer(Chunk.search_vector))
+        .on_conflict_do_nothing()
+        .execution_options(preserve_rowcount=True)
+    )
+    return result.rowcount
+
+
+def _missing_batches(
+    db: Session,
+    missing: list,
+    page_size: int,
+    count_tokens: Callable[[str], int],
+    budget: TokenBudget,
+):
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Chunk.id, Chunk.embedding_input)
+            .where(*missing)
+            .where(Chunk.id > last_id)
             .order_by(Chunk.id)
             .limit(page_size)
         ).all()
+        db.commit()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        # Identical inputs (repealed articles, say) are embedded once
+        ids: dict[str, list[int]] = {}
+        for row in rows:
+            ids.setdefault(row.embedding_input, []).append(row.id)
+        yield from _pack(
+            [(chunk_ids, text) for text, chunk_ids in ids.items()],
+            count_tokens,
+            budget,
+        )
 
-        batches = _batch(chunks, batch_size)
-        with ThreadPoolExecutor(max_workers=max_workers) as pool:
-            futures = {
-                pool.submit(_call_api, [c.embedding_input for c in b]): b
-                for b in batches
-            }
-            for future in as_completed(futures):
-                batch = futures[future]
-                try:
-                    response = future.result()
-                except openai.InternalServerError as e:
-                    _log_failure(batch, e)
-                else:
-                    for chunk, data in zip(batch, response.data):
-                        chunk.embedding = data.embedding
-        total += len(chunks)
+
+def _pack(items, count_tokens: Callable[[str], int], budget: TokenBudget):
+    """Split (chunk ids, text) items into batches within the budget,
+    shortest first, so each batch holds texts of similar length."""
+    batch, tokens = [], 0
+    for n, item in sorted(
+        ((count_tokens(item[1]), item) for item in items),
+        key=lambda pair: pair[0],
+    ):
+        if batch and (tokens + n > budget.tokens or len(batch) >= batch_size):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(item)
+        tokens += n
+    if batch:
+        yield batch
+
+
+def _embed(
+    batch,
+    count_tokens: Callable[[str], int],
+    budget: TokenBudget,
+    limiter: AdaptiveLimiter,
+):
+    """Embed a batch, splitting it when the endpoint rejects it as too
+    large. Returns the embeddings and the tokens they took."""
+    texts = [text for _, text in batch]
+    estimated = sum(map(count_tokens, texts))
+    try:
+        response = _call_api(texts, estimated, limiter)
+    except openai.APIStatusError as e:
+        if len(batch) == 1 or not _too_large(e):
+            raise
+        budget.shrink(estimated)
+        half = len(batch) // 2
+        head, head_tokens = _embed(batch[:half], count_tokens, budget, limiter)
+        tail, tail_tokens = _embed(batch[half:], count_tokens, budget, limiter)
+        return head + tail, head_tokens + tail_tokens
+    budget.grow()
+    usage = getattr(response, "usage", None)
+    tokens = usage.total_tokens if usage else estimated
+    return [data.embedding for data in response.data], tokens
+
+
+def _too_large(error: openai.APIError) -> bool:
+    status_code = getattr(error, "status_code", None)
+    if status_code == 413:
+        return True
+    if status_code not in (400, 422):
+        return False
+    return error.code == "context_length_exceeded" or bool(
+        _TOO_LARGE.search(error.message)
+    )
+
+
+def _write_embeddings(
+    session_factory: sessionmaker,
+    finished: Queue,
+    slots: threading.Semaphore,
+    limiter: AdaptiveLimiter,
+    total: int,
+    page_size: int,
+) -> tuple[int, int]:
+    done = 0
+    failed = 0
+    tokens = 0
+    rows: list[dict] = []
+    failures: list[dict] = []
+    t0 = time.monotonic()
+
+    def flush():
+        nonlocal done, failed, rows, failures
+        with session_factory() as db:
+            if rows:
+                ids = [row["id"] for row in rows]
+                db.execute(_update_embedding, rows)
+                store_embeddings(db, Chunk.id.in_(ids))
+                db.execute(
+                    delete(EmbeddingFailure).where(EmbeddingFailure.chunk_id.in_(ids))
+                )
+            if failures:
+                stmt = insert(EmbeddingFailure).values(failures)
+                db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[EmbeddingFailure.chunk_id],
+                        set_={
+                            "error": stmt.excluded.error,
+                            "attempts": EmbeddingFailure.attempts + 1,
+                            "failed_at": func.now(),
+                        },
+                    )
+                )
+            db.commit()
+        done += len(rows)
+        failed += len(failures)
+        rows, failures = [], []
+        elapsed = time.monotonic() - t0
+        rate = (done + failed) / elapsed
+        eta = _fmt_eta(max(total - done - failed, 0) / rate)
+        click.echo(
+            f"    {done}/{total} embedded, {failed} failed "
+            f"({rate:.0f}/s, {tokens / elapsed:.0f} tokens/s, "
+            f"{int(limiter.limit)} in flight, ETA {eta})"
+        )
+
+    try:
+        while (item := finished.get()) is not None:
+            batch, future = item
+            slots.release()
+            try:
+                embeddings, used = future.result()
+            except openai.APIError as e:
+                if getattr(e, "status_code", None) in _FATAL_STATUS:
+                    raise
+                _log_failure(batch, e)
+                failures += [
+                    {"chunk_id": chunk_id, "error": str(e)}
+                    for chunk_ids, _ in batch
+                    for chunk_id in chunk_ids
+                ]
+                continue
+            tokens += used
+            for (chunk_ids, _), embedding in zip(batch, embeddings):
+                vector = _halfvec_text(embedding)
+                rows += [
+                    {"id": chunk_id, "embedding": vector} for chunk_id in chunk_ids
+                ]
+            if len(rows) + len(failures) >= page_size:
+                flush()
+        if rows or failures:
+            flush()
+    finally:
+        # Unblocks the reader if writing failed
+        slots.release(2 * max_workers)
+    return done, failed
+
+
+def reduce_missing_chunks(db: Session, batch_size: int = 2000):
+    """Fill embedding_reduced from embedding for chunks embedded before the
+    column existed, in batches that commit on their own.
+
+    Filled rows leave the partial ix_chunk_embedding_reduced_missing index,
+    so each batch takes the next ones from it instead of scanning the table.
+    """
+    total = 0
+    while True:
+        result = db.execute(
+            text(
+                "UPDATE chunk SET embedding_reduced = "
+                f"l2_normalize(subvector(embedding, 1, {REDUCED_EMBEDDING_DIMS})) "
+                "WHERE id IN (SELECT id FROM chunk "
+                "WHERE embedding IS NOT NULL AND embedding_reduced IS NULL "
+                "ORDER BY id LIMIT :n)"
+            ),
+            {"n": batch_size},
+        )
         db.commit()
-        db.expire_all()
+        if not result.rowcount:
+            break
+        total += result.rowcount
 
+    if total:
+        click.echo(f"    {total} reduced embeddings filled in")
 
-def _log_failure(batch, error):
-    chunk_ids = [c.id for c in batch]
-    click.secho(f"Embedding failed for chunks {chunk_ids}: {error}", fg="red")
 
+def _halfvec_text(values: list[float]) -> str:
+    # pgvector's bind processor prints every float at full precision, which
+    # dominated the writes; halfvec keeps fewer than 4 significant digits.
+    return ("[" + ",".join(["%.5g"] * len(values)) + "]") % tuple(values)
 
-def _batch(items, size):
-    return [items[i : i + size] for i in range(0, len(items), size)]
+
+def _log_failure(batch, error):
+    chunk_ids = [chunk_id for ids, _ in batch for chunk_id in ids]
+    click.secho(f"Embedding failed for chunks {chunk_ids}: {error}", fg="red")
 
 
+# No wait here: the limiter pauses all workers before the next attempt
 @retry(
-    retry=retry_if_exception_type(
-        (
-            openai.RateLimitError,
-            openai.APITimeoutError,
-            openai.APIConnectionError,
-        )
-    ),
-    wait=wait_exponential(multiplier=1, min=4, max=60),
+    retry=retry_if_exception_type(_RETRYABLE),
     stop=stop_after_attempt(6),
+    reraise=True,
 )
-def _call_api(input_: list[str]):
-    return client.embeddings.create(
-        model=embedding_model,
-        input=input_,
-    )
+def _call_api(input_: list[str], tokens: int, limiter: AdaptiveLimiter):
+    started = limiter.acquire()
+    try:
+        raw = client.embeddings.with_raw_response.create(
+            model=embedding_model,
+            input=input_,
+        )
+    except (openai.RateLimitError, openai.InternalServerError) as e:
+        limiter.throttled(started, e.response.headers)
+        raise
+    except (openai.APITimeoutError, openai.APIConnectionError):
+        limiter.throttled(started)
+        raise
+    except Exception:
+        limiter.failed()
+        raise
+    limiter.succeeded(started, tokens, raw.headers)
+    return raw.parse()
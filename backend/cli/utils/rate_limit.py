@@ -0,0 +1,121 @@
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+# x-ratelimit-reset-* values such as "250ms", "1.5s" or "6m0s"
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class AdaptiveLimiter:
+    """Schedules API calls for a pool of worker threads.
+
+    Concurrency follows AIMD: it starts at one call and adds one per
+    success (doubling each round trip) until the first sign of overload,
+    then adds one per round trip while the time per token stays within
+    1.5x its running average. A 429 or 5xx halves it, once per round
+    trip however many calls fail together.
+
+    Retry-After, or exhausted x-ratelimit-* headers, pause every worker
+    rather than just the one that was told. Without them, pauses back off
+    exponentially. An optional requests-per-minute bucket caps the rate.
+    """
+
+    def __init__(self, ceiling: int, requests_per_minute: int | None = None):
+        self.ceiling = ceiling
+        self.limit = 1.0
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.rate = requests_per_minute / 60 if requests_per_minute else None
+        self.burst = max(1.0, self.rate or 0)
+        self.bucket = self.burst
+        self.cost: float | None = None  # running average seconds per token
+        self._slow_start = True
+        self._backoff = 0
+        self._cut_at = 0.0
+        self._refilled_at = time.monotonic()
+        self._cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """Wait for a slot, returning the start time to report back."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if self.rate:
+                    self.bucket = min(
+                        self.burst, self.bucket + (now - self._refilled_at) * self.rate
+                    )
+                    self._refilled_at = now
+                    wait = max(wait, (1 - self.bucket) / self.rate)
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(wait if wait > 0 else None)
+            self.in_flight += 1
+            if self.rate:
+                self.bucket -= 1
+            return now
+
+    def succeeded(
+        self, started: float, tokens: int, headers: httpx.Headers | None = None
+    ) -> None:
+        with self._cond:
+            self._release()
+            self._backoff = 0
+            cost = (time.monotonic() - started) / max(tokens, 1)
+            if self.cost is None or cost <= 1.5 * self.cost:
+                step = 1 if self._slow_start else 1 / self.limit
+                self.limit = min(self.ceiling, self.limit + step)
+            else:
+                self._slow_start = False
+            self.cost = cost if self.cost is None else 0.8 * self.cost + 0.2 * cost
+            if headers and headers.get("x-ratelimit-remaining-requests") == "0":
+                self._pause(_duration(headers.get("x-ratelimit-reset-requests", "")))
+
+    def throttled(self, started: float, headers: httpx.Headers | None = None) -> None:
+        with self._cond:
+            self._release()
+            self._slow_start = False
+            # Calls that started before the last cut saw the old limit
+            if started >= self._cut_at:
+                self.limit = max(1.0, self.limit / 2)
+                self._cut_at = time.monotonic()
+            self._pause(retry_after(headers) if headers else None)
+
+    def failed(self) -> None:
+        with self._cond:
+            self._release()
+
+    def _pause(self, seconds: float | None) -> None:
+        if seconds is None:
+            seconds = min(60, 2**self._backoff)
+            self._backoff += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self._cond.notify_all()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._cond.notify_all()
+
+
+def retry_after(headers: httpx.Headers) -> float | None:
+    """Seconds from retry-after-ms or retry-after (seconds or HTTP date)."""
+    try:
+        if ms := headers.get("retry-after-ms"):
+            return float(ms) / 1000
+        if value := headers.get("retry-after"):
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _duration(value: str) -> float | None:
+    parts = _DURATION.findall(value)
+    return sum(float(n) * _UNITS[unit] for n, unit in parts) if parts else None
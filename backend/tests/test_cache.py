@@ -0,0 +1,206 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.cache import LRUCache, TieredCache, cache_stats
+from app.services.embedding_service import AsyncEmbeddingService
+from app.services.query_expansion_service import AsyncQueryExpansionService
+from app.services.reranker_service import AsyncRerankerService
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise RedisConnectionError()
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise RedisConnectionError()
+        self.data[key] = value
+
+    async def mget(self, keys):
+        if self.fail:
+            raise RedisConnectionError()
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def set(self, key, value, ex=None):
+        self.ops.append((key, value))
+
+    async def execute(self):
+        for key, value in self.ops:
+            await self.redis.set(key, value)
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, input, model):
+        self.calls += 1
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[0.5, -1.25, 2.0])])
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert len(cache) == 2
+
+
+def test_tiered_cache_falls_back_to_redis():
+    redis = FakeRedis()
+    cache = TieredCache("t", maxsize=0, ttl=60, redis=lambda: redis)
+
+    async def run():
+        assert await cache.get("k") is None
+        await cache.set("k", b"v")
+        return await cache.get("k")
+
+    assert asyncio.run(run()) == b"v"
+    assert redis.data == {"t:k": b"v"}
+    assert (cache.stats.redis_hits, cache.stats.misses) == (1, 1)
+
+
+def test_tiered_cache_treats_redis_errors_as_misses():
+    cache = TieredCache("t", maxsize=8, ttl=60, redis=lambda: FakeRedis(fail=True))
+
+    async def run():
+        await cache.set("k", b"v")
+        return await cache.get("k"), await cache.get("other")
+
+    assert asyncio.run(run()) == (b"v", None)
+    assert (cache.stats.local_hits, cache.stats.misses) == (1, 1)
+
+
+def test_caches_sharing_a_namespace_are_exported_together():
+    first = TieredCache("shared", maxsize=8, ttl=60, redis=FakeRedis)
+    second = TieredCache("shared", maxsize=8, ttl=60, redis=FakeRedis)
+
+    async def run():
+        await first.get("k")
+        await second.set("k", b"v")
+        await second.get("k")
+
+    asyncio.run(run())
+    stats = cache_stats()["shared"]
+    assert (stats.local_hits, stats.misses) == (1, 1)
+
+    del first, second
+    assert "shared" not in cache_stats()
+
+
+def test_embedding_service_reuses_cached_vector():
+    redis = FakeRedis()
+    embeddings = FakeEmbeddings()
+    svc = AsyncEmbeddingService(
+        SimpleNamespace(embeddings=embeddings),
+        cache=TieredCache("emb", maxsize=8, ttl=60, redis=lambda: redis),
+    )
+
+    async def run():
+        first = await svc.embed_text("Kündigungsfrist  Mietvertrag")
+        second = await svc.embed_text(" Kündigungsfrist Mietvertrag")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert embeddings.calls == 1
+    assert first == second == [0.5, -1.25, 2.0]
+    assert len(next(iter(redis.data.values()))) == 3 * 2
+
+
+class FakeCompletions:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("upstream down")
+        content = '{"article_queries": ["Kündigung"], "decision_queries": ["bail"]}'
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _expansion_service(completions, redis):
+    return AsyncQueryExpansionService(
+        SimpleNamespace(chat=SimpleNamespace(completions=completions)),
+        cache=TieredCache("qexp", maxsize=8, ttl=60, redis=lambda: redis),
+    )
+
+
+def test_expansion_service_caches_per_language():
+    completions = FakeCompletions()
+    svc = _expansion_service(completions, FakeRedis())
+
+    async def run():
+        await svc.expand("Kündigungsfrist", "de")
+        await svc.expand("Kündigungsfrist", "de")
+        return await svc.expand("Kündigungsfrist", "fr")
+
+    result = asyncio.run(run())
+    assert completions.calls == 2
+    assert result.article_queries == ["Kündigung"]
+    assert svc.cache.stats.hit_rate == 1 / 3
+
+
+def test_expansion_failure_is_raised_and_not_cached():
+    redis = FakeRedis()
+    svc = _expansion_service(FakeCompletions(fail=True), redis)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(svc.expand("Kündigungsfrist", "de"))
+    assert redis.data == {}
+
+
+class FakeRerank:
+    def __init__(self, scores):
+        self.scores = scores
+        self.documents = []
+
+    async def rerank(self, query, documents, model, top_n):
+        self.documents.append(documents)
+        results = [
+            SimpleNamespace(index=i, relevance_score=self.scores[doc])
+            for i, doc in enumerate(documents)
+        ]
+        results.sort(key=lambda r: r.relevance_score, reverse=True)
+        return SimpleNamespace(results=results[:top_n])
+
+
+def test_reranker_only_sends_uncached_candidates():
+    redis = FakeRedis()
+    client = FakeRerank({"a": 0.1, "b": 0.9, "c": 0.5})
+    svc = AsyncRerankerService(
+        client, cache=TieredCache("rrk", maxsize=0, ttl=60, redis=lambda: redis)
+    )
+    chunks = {t: SimpleNamespace(id=i, text=t) for i, t in enumerate("abc")}
+
+    async def run():
+        await svc.rerank("q", [chunks["a"], chunks["b"]], top_n=1)
+        return await svc.rerank("q", list(chunks.values()), top_n=2)
+
+    result = asyncio.run(run())
+    assert client.documents == [["a", "b"], ["c"]]
+    assert [c.text for c in result] == ["b", "c"]
@@ -1,37 +1,51 @@
 import pytest
 from fastapi.testclient import TestClient
 
+from app.core.config import settings
 from app.main import app
 from app.schemas.events import Source, Sources, TextDelta, ThinkingDelta
 
+MODEL = settings.allowed_models[0]
+
 
 @pytest.fixture
 def client():
     return TestClient(app, cookies={"lang": "de"})
 
 
-def test_chat_endpoint_returns_sse_stream(client, monkeypatch):
-    def mock_process_message(messages, lang):
-        yield Sources(
+def _mock_events():
+    return [
+        Sources(
             type="sources",
             sources=[
-                Source(id="1", reference="Art. 1", url="https://example.com/art1")
+                Source(id=1, citation="Art. 1 OR", url="https://example.com/art1")
             ],
-        )
-        yield ThinkingDelta(type="thinking_delta", delta="Thinking")
-        yield TextDelta(type="text_delta", delta="Response")
+        ),
+        ThinkingDelta(type="thinking_delta", delta="Thinking"),
+        TextDelta(type="text_delta", delta="Response"),
+    ]
+
+
+@pytest.fixture
+def mock_async_pipeline(monkeypatch):
+    async def mock_process_message(self, *, messages, model, lang):
+        for event in _mock_events():
+            yield event
 
     import app.api.v1.endpoints.chats as chats_module
 
     monkeypatch.setattr(
-        chats_module.ChatService,
-        "process_message",
-        lambda self, messages, lang: mock_process_message(messages, lang),
+        chats_module.AsyncChatService, "process_message", mock_process_message
     )
 
+
+def test_chat_endpoint_returns_sse_stream(client, mock_async_pipeline):
     response = client.post(
         "/api/chat",
-        json={"messages": [{"role": "user", "content": "Test question"}]},
+        json={
+            "messages": [{"role": "user", "content": "Test question"}],
+            "model": MODEL,
+        },
     )
 
     assert response.status_code == 200
@@ -45,31 +59,44 @@ def test_chat_endpoint_returns_sse_stream(client, monkeypatch):
     assert '"type":"text_delta"' in lines[2]
 
 
-def test_chat_endpoint_with_history(client, monkeypatch):
-    def mock_process_message(messages, lang):
-        yield TextDelta(type="text_delta", delta="Response")
+def test_chat_endpoint_with_history(client, mock_async_pipeline):
+    response = client.post(
+        "/api/chat",
+        json={
+            "messages": [
+                {"role": "user", "content": "First question"},
+                {"role": "assistant", "content": "First answer"},
+                {"role": "user", "content": "Follow-up"},
+            ],
+            "model": MODEL,
+        },
+    )
+
+    assert response.status_code == 200
+    assert '"type":"text_delta"' in response.text
+
+
+def test_chat_endpoint_sync_pipeline(client, monkeypatch):
+    def mock_process_message(self, *, messages, model, lang):
+        yield from _mock_events()
 
     import app.api.v1.endpoints.chats as chats_module
 
+    monkeypatch.setattr(settings, "chat_pipeline", "sync")
     monkeypatch.setattr(
-        chats_module.ChatService,
-        "process_message",
-        lambda self, messages, lang: mock_process_message(messages, lang),
+        chats_module.ChatService, "process_message", mock_process_message
     )
 
     response = client.post(
         "/api/chat",
         json={
-            "messages": [
-                {"role": "user", "content": "First question"},
-                {"role": "assistant", "content": "First answer"},
-                {"role": "user", "content": "Follow-up"},
-            ]
+            "messages": [{"role": "user", "content": "Test question"}],
+            "model": MODEL,
         },
     )
 
     assert response.status_code == 200
-    assert '"type":"text_delta"' in response.text
+    assert len(response.text.strip().split("\n\n")) == 3
 
 
 def test_chat_endpoint_rejects_system_role(client):
@@ -88,3 +115,18 @@ def test_chat_endpoint_rejects_empty_messages(client):
     )
 
     assert response.status_code == 422
+
+
+def test_metrics_endpoint_requires_the_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", None)
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(settings, "metrics_token", "secret")
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert "almalex_stage_seconds" in response.text
+    assert "almalex_cache_requests_total" in response.text
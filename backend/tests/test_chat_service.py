@@ -0,0 +1,320 @@
+import asyncio
+import dataclasses
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+
+from app.core.config import settings
+from app.repositories.chunk_repository import ChunkHit
+from app.schemas.chat import Message
+from app.schemas.events import TextDelta
+from app.schemas.query import ExpandedQueries
+from app.services.chat_service import AsyncChatService
+from app.services.query_expansion_service import AsyncQueryExpansionService
+from app.services.reranker_service import AsyncRerankerService
+from app.services.retrieval_log_service import RetrievalLogService, RetrievalTrace
+
+
+def _chunk(id_, source_type):
+    return ChunkHit(
+        id=id_,
+        source_type=source_type,
+        article_id=id_ if source_type == "article" else None,
+        decision_id=id_ if source_type == "decision" else None,
+        text=f"text {id_}",
+        citation=f"cit {id_}",
+        source_url=f"https://x/{id_}",
+        rrf_score=1 / (61 + id_),
+        vector_rank=id_ + 1,
+        fts_rank=None,
+    )
+
+
+class FakeRepo:
+    def __init__(self):
+        self.embeddings = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.multi_calls = 0
+
+    async def search_chunks(self, embedding, texts, *, source_type, top_k):
+        self.embeddings.append(embedding)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [_chunk(i, source_type) for i in range(top_k)]
+
+    async def search_chunks_multi(self, embedding, queries, top_k):
+        self.multi_calls += 1
+        return {st: [_chunk(i, st) for i in range(top_k[st])] for st in queries}
+
+
+class FakeEmbedding:
+    async def embed_text(self, text):
+        return [0.0]
+
+
+class FakeExpansion:
+    async def expand(self, query, lang):
+        return ExpandedQueries(article_queries=[query], decision_queries=[query])
+
+
+class FakeReranker:
+    async def rerank(self, query, chunks, top_n):
+        return chunks[:top_n]
+
+
+class SlowEmbedding:
+    async def embed_text(self, text):
+        await asyncio.sleep(1)
+        return [0.0]
+
+
+class FailingEmbedding:
+    async def embed_text(self, text):
+        raise RuntimeError("provider unavailable")
+
+
+class FlakyReranker:
+    """Hangs on the first call of each rerank, answers promptly after."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    async def rerank(self, query, chunks, top_n):
+        self.calls += 1
+        if self.calls <= 2:
+            await asyncio.sleep(self.delay)
+        return list(reversed(chunks))[:top_n]
+
+
+class FailingFirstReranker:
+    """Fails the first call of each rerank once the hedge is in flight."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def rerank(self, query, chunks, top_n):
+        self.calls += 1
+        if self.calls <= 2:
+            await asyncio.sleep(0.03)
+            raise RuntimeError("provider unavailable")
+        await asyncio.sleep(0.03)
+        return list(reversed(chunks))[:top_n]
+
+
+class FakeLLM:
+    async def generate(self, **kwargs):
+        yield TextDelta(type="text_delta", delta="Antwort")
+
+
+class FakeRetrievalLog:
+    def __init__(self):
+        self.traces = []
+
+    def record(self, trace):
+        self.traces.append(trace)
+
+
+def _service(repo, embedding=None, reranker=None, retrieval_log=None, expansion=None):
+    return AsyncChatService(
+        chunk_repo=repo,
+        embedding_service=embedding or FakeEmbedding(),
+        llm_service=FakeLLM(),
+        query_expansion_service=expansion or FakeExpansion(),
+        reranker=reranker or FakeReranker(),
+        retrieval_log=retrieval_log,
+    )
+
+
+async def _collect(svc):
+    return [
+        event
+        async for event in svc.process_message(
+            messages=[Message(role="user", content="Kündigungsfrist")],
+            model="m",
+            lang="de",
+        )
+    ]
+
+
+def test_article_and_decision_searches_run_concurrently():
+    repo = FakeRepo()
+    events = asyncio.run(_collect(_service(repo)))
+
+    assert repo.max_in_flight == 2
+    assert [e.type for e in events] == [
+        "status",
+        "sources",
+        "metadata",
+        "status",
+        "text_delta",
+        "status",
+    ]
+
+
+def test_combined_strategy_issues_one_search(monkeypatch):
+    monkeypatch.setattr(settings, "search_strategy", "combined")
+    repo = FakeRepo()
+    events = asyncio.run(_collect(_service(repo)))
+
+    assert repo.multi_calls == 1
+    assert repo.max_in_flight == 0
+    sources = next(e for e in events if e.type == "sources").sources
+    top_n = settings.search_article_top_k + settings.search_decision_top_k
+    assert len(sources) == top_n
+
+
+def test_expired_stages_fall_back_and_are_reported(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_timeout", 0.05)
+    monkeypatch.setattr(settings, "rerank_timeout", 0.05)
+    repo = FakeRepo()
+    svc = _service(repo, embedding=SlowEmbedding(), reranker=FlakyReranker(1))
+    events = asyncio.run(_collect(svc))
+
+    assert repo.embeddings == [None, None]
+    metadata = next(e for e in events if e.type == "metadata")
+    assert sorted(metadata.degraded) == [
+        "embedding",
+        "rerank[article]",
+        "rerank[decision]",
+    ]
+    sources = next(e for e in events if e.type == "sources").sources
+    assert sources[0].id == 0
+
+
+def test_hedged_rerank_wins_over_slow_first_request(monkeypatch):
+    monkeypatch.setattr(settings, "rerank_hedge_after", 0.02)
+    reranker = FlakyReranker(1)
+    events = asyncio.run(_collect(_service(FakeRepo(), reranker=reranker)))
+
+    assert reranker.calls == 4
+    assert next(e for e in events if e.type == "metadata").degraded == []
+    sources = next(e for e in events if e.type == "sources").sources
+    assert sources[0].id == settings.rerank_article_candidates - 1
+
+
+def test_failed_stages_fall_back_and_are_reported():
+    repo = FakeRepo()
+    events = asyncio.run(_collect(_service(repo, embedding=FailingEmbedding())))
+
+    assert repo.embeddings == [None, None]
+    assert next(e for e in events if e.type == "metadata").degraded == ["embedding"]
+    assert any(e.type == "sources" for e in events)
+
+
+def test_provider_errors_in_real_services_degrade_to_top_n():
+    async def unavailable(**kwargs):
+        raise RuntimeError("provider unavailable")
+
+    expansion = AsyncQueryExpansionService(
+        SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=unavailable))
+        )
+    )
+    reranker = AsyncRerankerService(SimpleNamespace(rerank=unavailable))
+    svc = _service(FakeRepo(), reranker=reranker, expansion=expansion)
+    events = asyncio.run(_collect(svc))
+
+    metadata = next(e for e in events if e.type == "metadata")
+    assert sorted(metadata.degraded) == [
+        "expansion",
+        "rerank[article]",
+        "rerank[decision]",
+    ]
+    sources = next(e for e in events if e.type == "sources").sources
+    assert (
+        len(sources) == settings.search_article_top_k + settings.search_decision_top_k
+    )
+
+
+def test_hedged_rerank_outlives_failed_first_request(monkeypatch):
+    monkeypatch.setattr(settings, "rerank_hedge_after", 0.02)
+    reranker = FailingFirstReranker()
+    events = asyncio.run(_collect(_service(FakeRepo(), reranker=reranker)))
+
+    assert reranker.calls == 4
+    assert next(e for e in events if e.type == "metadata").degraded == []
+    sources = next(e for e in events if e.type == "sources").sources
+    assert sources[0].id == settings.rerank_article_candidates - 1
+
+
+def test_sources_allow_decisions_without_url():
+    decision = dataclasses.replace(_chunk(1, "decision"), source_url=None)
+    event = _service(FakeRepo())._build_sources_event(
+        [_chunk(0, "article")], [decision]
+    )
+
+    assert [(s.citation, s.url) for s in event.sources] == [
+        ("cit 0", "https://x/0"),
+        ("cit 1", None),
+    ]
+
+
+def test_stream_and_stage_metrics_are_recorded():
+    def count(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    before = (
+        count("almalex_stage_seconds_count", stage="rerank[article]"),
+        count(
+            "almalex_time_to_first_token_seconds_count", pipeline="async", kind="text"
+        ),
+        count("almalex_stream_seconds_count", pipeline="async"),
+    )
+    asyncio.run(_collect(_service(FakeRepo())))
+    after = (
+        count("almalex_stage_seconds_count", stage="rerank[article]"),
+        count(
+            "almalex_time_to_first_token_seconds_count", pipeline="async", kind="text"
+        ),
+        count("almalex_stream_seconds_count", pipeline="async"),
+    )
+
+    assert [b - a for a, b in zip(before, after)] == [1, 1, 1]
+
+
+def test_retrieval_trace_is_recorded():
+    log = FakeRetrievalLog()
+    asyncio.run(_collect(_service(FakeRepo(), retrieval_log=log)))
+
+    [trace] = log.traces
+    assert trace.expanded["article_queries"] == ["Kündigungsfrist"]
+    candidates = trace.candidates["article"]
+    assert len(candidates) == settings.rerank_article_candidates
+    assert candidates[0] == {
+        "id": 0,
+        "source_id": 0,
+        "rrf_rank": 1,
+        "rrf_score": 1 / 61,
+        "vector_rank": 1,
+        "fts_rank": None,
+    }
+    assert len(trace.reranked["decision"]) == settings.search_decision_top_k
+    assert {"expansion", "search[article]", "rerank[decision]"} <= set(trace.timings)
+
+
+def test_dropped_retrieval_traces_are_counted():
+    def dropped(reason):
+        return (
+            REGISTRY.get_sample_value(
+                "almalex_retrieval_log_dropped_total", {"reason": reason}
+            )
+            or 0
+        )
+
+    def unavailable():
+        raise ConnectionError("database unavailable")
+
+    async def run():
+        log = RetrievalLogService(unavailable, flush_interval=60, max_pending=2)
+        for _ in range(3):
+            log.record(RetrievalTrace(query="q", lang="de"))
+        log._task.cancel()
+        await log.flush()
+
+    before = dropped("full"), dropped("write_failed")
+    asyncio.run(run())
+    assert (dropped("full"), dropped("write_failed")) == (before[0] + 1, before[1] + 2)
@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import Future
+from queue import Queue
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from cli.utils.embedding import _too_large, _write_embeddings
+
+
+def _error(status, message, code=None):
+    response = httpx.Response(status, request=httpx.Request("POST", "http://x"))
+    body = {"message": message, "code": code}
+    return openai.APIStatusError(message, response=response, body=body)
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (_error(413, "Payload Too Large"), True),
+        (_error(400, "Invalid request", code="context_length_exceeded"), True),
+        (
+            _error(
+                400,
+                "This model's maximum context length is 8192 tokens, however "
+                "you requested 9000 tokens",
+            ),
+            True,
+        ),
+        (
+            _error(
+                422, "Input validation error: `inputs` must have less than 512 tokens"
+            ),
+            True,
+        ),
+        (_error(400, "max_tokens must be at least 1, got 0 tokens"), False),
+        (_error(400, "Invalid model name"), False),
+        (_error(429, "Rate limit reached for tokens per min"), False),
+        (
+            openai.APIError("Bad body", httpx.Request("POST", "http://x"), body=None),
+            False,
+        ),
+    ],
+)
+def test_only_context_length_rejections_split_the_batch(error, expected):
+    assert _too_large(error) is expected
+
+
+class _Session:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, statement, *args):
+        self.statements.append(statement)
+
+    def commit(self):
+        pass
+
+
+def _write(error):
+    future = Future()
+    future.set_exception(error)
+    finished = Queue()
+    finished.put(([([1, 2], "text")], future))
+    finished.put(None)
+    statements = []
+    result = _write_embeddings(
+        lambda: _Session(statements),
+        finished,
+        threading.Semaphore(0),
+        SimpleNamespace(limit=1),
+        total=2,
+        page_size=100,
+    )
+    return result, statements
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        _error(400, "Invalid input"),
+        _error(422, "Input validation error"),
+        openai.APIError("Bad body", httpx.Request("POST", "http://x"), body=None),
+    ],
+)
+def test_rejected_batches_are_recorded_as_failures(error):
+    (done, failed), statements = _write(error)
+    assert (done, failed) == (0, 2)
+    assert len(statements) == 1
+
+
+@pytest.mark.parametrize("status", [401, 403, 404])
+def test_auth_and_not_found_errors_stop_the_run(status):
+    with pytest.raises(openai.APIStatusError):
+        _write(_error(status, "Unauthorized"))
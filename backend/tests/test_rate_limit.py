@@ -0,0 +1,41 @@
+import time
+
+import httpx
+import pytest
+
+from cli.utils.rate_limit import AdaptiveLimiter, retry_after
+
+
+def test_limiter_grows_then_halves_once_per_round_trip():
+    limiter = AdaptiveLimiter(ceiling=8)
+    for _ in range(4):
+        limiter.acquire()
+        # Calls of a steady second each
+        limiter.succeeded(time.monotonic() - 1, tokens=100)
+    assert limiter.limit == 5
+
+    started = [limiter.acquire() for _ in range(3)]
+    for s in started:
+        limiter.throttled(s, httpx.Headers({"retry-after": "0"}))
+    assert limiter.limit == 2.5
+    assert limiter.in_flight == 0
+
+    # Out of slow start, growth is one slot per limit successes
+    limiter.acquire()
+    limiter.succeeded(time.monotonic() - 1, tokens=100)
+    assert limiter.limit == pytest.approx(2.9)
+
+
+def test_limiter_pauses_all_workers_for_retry_after():
+    limiter = AdaptiveLimiter(ceiling=4)
+    limiter.throttled(limiter.acquire(), httpx.Headers({"retry-after-ms": "50"}))
+    t0 = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - t0 >= 0.04
+
+
+def test_retry_after_formats():
+    assert retry_after(httpx.Headers({"retry-after": "1.5"})) == 1.5
+    assert retry_after(httpx.Headers({"retry-after-ms": "250"})) == 0.25
+    assert retry_after(httpx.Headers({"retry-after": "soon"})) is None
+    assert retry_after(httpx.Headers()) is None
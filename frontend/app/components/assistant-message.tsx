@@ -88,7 +88,7 @@ export function AssistantMessageBlock({ message }: { message: Message }) {
                       if (source) {
                         return (
                           <a
-                            href={source.url}
+                            href={source.url ?? undefined}
                             target="_blank"
                             rel="noopener noreferrer"
                             {...props}
@@ -13,7 +13,7 @@ export type Block = TextBlock | ThinkingBlockData;
 export type Source = {
   id: number;
   citation: string;
-  url: string;
+  url: string | null;
 };
 
 export type Message = {
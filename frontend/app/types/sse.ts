@@ -22,9 +22,15 @@ export type ErrorEvent = {
   message: string;
 };
 
+export type MetadataEvent = {
+  type: "metadata";
+  degraded: string[];
+};
+
 export type ServerSentEvent =
   | TextDeltaEvent
   | ThinkingDeltaEvent
   | SourcesEvent
   | StatusEvent
-  | ErrorEvent;
+  | ErrorEvent
+  | MetadataEvent;